@@ -1,11 +1,15 @@
 #wbinder 11.02.2026
 #streamlit run MMC.py
 
+import io
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+from app_cache import LRUCache, hash_frame, make_key
+from systems_ranking import CRITERIA, SYSTEMS_DATA, rank_systems, recommendation
+
 # Set page configuration
 st.set_page_config(
     page_title="Modular Systems Matrix",
@@ -36,39 +40,47 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Data Definition
-data = [
-    {"System": "Fully In-Situ Slabs", "Speed": 2, "Cost": 5, "Sustainability": 2, "Logistics": 5, "Quality": 2, "Short": "In-Situ Slab"},
-    {"System": "Semi-Precast Slabs", "Speed": 3.5, "Cost": 4.5, "Sustainability": 2.5, "Logistics": 4, "Quality": 4, "Short": "Semi-Precast"},
-    {"System": "Steel Beams with Hollowcore", "Speed": 4.5, "Cost": 3, "Sustainability": 4, "Logistics": 3, "Quality": 3.5, "Short": "Steel/Hollowcore"},
-    {"System": "Prefabricated Timber Panels", "Speed": 4, "Cost": 3.5, "Sustainability": 5, "Logistics": 4.5, "Quality": 4, "Short": "Timber Panel"},
-    {"System": "Volumetric Concrete Box", "Speed": 5, "Cost": 2, "Sustainability": 3, "Logistics": 1.5, "Quality": 5, "Short": "Concrete Box"},
-    {"System": "Volumetric Steel Box", "Speed": 5, "Cost": 2, "Sustainability": 4, "Logistics": 2, "Quality": 5, "Short": "Steel Box"},
-]
+df = pd.DataFrame(SYSTEMS_DATA)
 
-df = pd.DataFrame(data)
+RADAR_CATEGORIES = ['Speed', 'Cost', 'Sustainability', 'Logistics', 'Quality']
 
-# Header
-st.title("Modular Systems Matrix")
-st.caption("Comparative analysis of structural solutions and final selection. B+G wbinder. 11.02.2026")
 
-# Main Layout
-col1, col2 = st.columns([2, 1])
+@st.cache_resource
+def shared_cache() -> LRUCache:
+    # One cache per server process, shared by all sessions
+    return LRUCache()
+
+
+cache = shared_cache()
+
+
+def figure_png(fig) -> bytes:
+    """PNG bytes of a figure; the figure is closed so no pyplot state is kept per rerun."""
+    import matplotlib.pyplot as plt
+
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def render_scores_chart(df) -> bytes:
+    # matplotlib is only imported on a cache miss
+    import matplotlib.pyplot as plt
 
-with col1:
-    st.subheader("System Performance Scores (1-5)")
-    
     # Prepare data for Matplotlib Bar Chart
-    metrics = ["Speed", "Cost", "Logistics"]
     labels = df["Short"].tolist()
     x = np.arange(len(labels))
     width = 0.25
-    
+
     fig, ax = plt.subplots(figsize=(10, 6))
-    
-    rects1 = ax.bar(x - width, df["Speed"], width, label='Speed', color="#3b82f6")
-    rects2 = ax.bar(x, df["Cost"], width, label='Cost', color="#10b981")
-    rects3 = ax.bar(x + width, df["Logistics"], width, label='Logistics', color="#f59e0b")
-    
+
+    ax.bar(x - width, df["Speed"], width, label='Speed', color="#3b82f6")
+    ax.bar(x, df["Cost"], width, label='Cost', color="#10b981")
+    ax.bar(x + width, df["Logistics"], width, label='Logistics', color="#f59e0b")
+
     ax.set_ylabel('Score')
     ax.set_xticks(x)
     ax.set_xticklabels(labels)
@@ -76,49 +88,96 @@ with col1:
     ax.legend()
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
-    
-    plt.tight_layout()
-    st.pyplot(fig)
 
-with col2:
-    st.subheader("System Spotlight")
-    selected_name = st.selectbox("Select System", df["System"].tolist(), index=1)
-    selected_row = df[df["System"] == selected_name].iloc[0]
+    fig.tight_layout()
+    return figure_png(fig)
+
+
+def render_radar_chart(values) -> bytes:
+    import matplotlib.pyplot as plt
 
     # Matplotlib Radar Chart
-    categories = ['Speed', 'Cost', 'Sustainability', 'Logistics', 'Quality']
-    values = [selected_row[cat] for cat in categories]
-    num_vars = len(categories)
-    
+    values = list(values)
+    num_vars = len(RADAR_CATEGORIES)
+
     # Compute angle for each axis
     angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
     values += values[:1]
     angles += angles[:1]
-    
-    fig_radar, ax_radar = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    ax_radar.fill(angles, values, color='#3b82f6', alpha=0.4)
-    ax_radar.plot(angles, values, color='#2563eb', linewidth=2)
-    
-    ax_radar.set_yticklabels([])
-    ax_radar.set_xticks(angles[:-1])
-    ax_radar.set_xticklabels(categories)
-    ax_radar.set_ylim(0, 5)
-    
-    st.pyplot(fig_radar)
-
-# Final Selection Banner
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    ax.fill(angles, values, color='#3b82f6', alpha=0.4)
+    ax.plot(angles, values, color='#2563eb', linewidth=2)
+
+    ax.set_yticklabels([])
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(RADAR_CATEGORIES)
+    ax.set_ylim(0, 5)
+    return figure_png(fig)
+
+# Criteria weights for the ranking
+with st.sidebar:
+    st.header("Criteria Weights")
+    weights = tuple(st.slider(c, 0.0, 5.0, 1.0, 0.5, key=f"w_{c}") for c in CRITERIA)
+    sensitivity = st.radio("Sensitivity Analysis", ["Around my weights", "All weightings"],
+                           help="Monte Carlo sampling of the weights: close to the sliders, or uniformly over every possible weighting.")
+    concentration = None
+    if sensitivity == "Around my weights":
+        concentration = st.slider("Confidence in Weights", 2, 200, 20,
+                                  help="Dirichlet concentration: higher keeps the sampled weights closer to the sliders.")
+
+if sum(weights) == 0:
+    st.warning("Set at least one criteria weight above 0.")
+    st.stop()
+
+ranking = cache.get_or_compute(
+    make_key("mmc_rank", hash_frame(df), weights, concentration),
+    lambda: rank_systems(df, weights, concentration),
+)
+
+# Header
+st.title("Modular Systems Matrix")
+st.caption("Comparative analysis of structural solutions and final selection. B+G wbinder. 11.02.2026")
+
+# Main Layout
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("System Performance Scores (1-5)")
+
+    # only depends on the data table, rendered once per server process
+    scores_png = cache.get_or_compute(make_key("mmc_scores", hash_frame(df)), lambda: render_scores_chart(df))
+    st.image(scores_png, use_container_width=True)
+
+with col2:
+    st.subheader("System Spotlight")
+    selected_name = st.selectbox("Select System", df["System"].tolist(), index=1)
+    selected_row = df[df["System"] == selected_name].iloc[0]
+
+    # one PNG per system (keyed by its scores)
+    values = tuple(float(selected_row[cat]) for cat in RADAR_CATEGORIES)
+    radar_png = cache.get_or_compute(make_key("mmc_radar", selected_name, values), lambda: render_radar_chart(values))
+    st.image(radar_png, use_container_width=True)
+
+# Final Selection Banner (from the weighted ranking)
+best_system, best_reason = recommendation(ranking)
 st.markdown(f"""
     <div class="selection-banner">
-        <h2 style="color: white; margin-top: 0;">Final Solution: Precast Beams with Semi-Precast Slabs</h2>
+        <h2 style="color: white; margin-top: 0;">Final Solution: {best_system}</h2>
         <p style="font-size: 1.1rem; opacity: 0.9;">
-            This system has been selected as the optimal choice. It offers the best balance of regional 
-            <b>cost-effectiveness</b> while achieving a <b>30-40% reduction in onsite time</b> compared 
-            to fully in-situ slabs. By utilizing precast beams and sacrificial formwork (planks), 
-            the project maximizes safety and speed without the high logistical premium of volumetric modular units.
+            {best_reason}
         </p>
     </div>
 """, unsafe_allow_html=True)
 
+st.subheader("Weighted Ranking")
+st.dataframe(
+    ranking.table(),
+    hide_index=True,
+    use_container_width=True,
+    column_config={"P(first)": st.column_config.ProgressColumn("P(first)", format="percent", min_value=0.0, max_value=1.0)},
+)
+
 # Logic Summary Table
 st.subheader("Selection Logic Summary")
 table_data = {
@@ -4,7 +4,10 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+
+from app_cache import LRUCache, hash_frame, make_key
+from modular_geometry import FOOTPRINTS, HEIGHT_PROFILES, building_layout, building_traces
+from systems_ranking import CRITERIA, SYSTEMS_DATA, rank_systems, recommendation
 
 # --- 1. APP CONFIGURATION ---
 st.set_page_config(
@@ -34,78 +37,41 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 2. DATA CONSTANTS ---
-SYSTEMS_DATA = [
-    {"System": "Fully In-Situ Slabs", "Speed": 2, "Cost": 5, "Sustainability": 2, "Logistics": 5, "Quality": 2, "Short": "In-Situ Slab"},
-    {"System": "Semi-Precast Slabs", "Speed": 3.5, "Cost": 4.5, "Sustainability": 2.5, "Logistics": 4, "Quality": 4, "Short": "Semi-Precast"},
-    {"System": "Steel Beams with Hollowcore", "Speed": 4.5, "Cost": 3, "Sustainability": 4, "Logistics": 3, "Quality": 3.5, "Short": "Steel/Hollowcore"},
-    {"System": "Prefabricated Timber Panels", "Speed": 4, "Cost": 3.5, "Sustainability": 5, "Logistics": 4.5, "Quality": 4, "Short": "Timber Panel"},
-    {"System": "Volumetric Concrete Box", "Speed": 5, "Cost": 2, "Sustainability": 3, "Logistics": 1.5, "Quality": 5, "Short": "Concrete Box"},
-    {"System": "Volumetric Steel Box", "Speed": 5, "Cost": 2, "Sustainability": 4, "Logistics": 2, "Quality": 5, "Short": "Steel Box"},
-]
 DF_MATRIX = pd.DataFrame(SYSTEMS_DATA)
 
+
+@st.cache_resource
+def shared_cache() -> LRUCache:
+    # One cache per server process, shared by all sessions
+    return LRUCache()
+
+
+cache = shared_cache()
+
 # --- 3. SIDEBAR NAVIGATION & PARAMETERS ---
 with st.sidebar:
     st.title("🏗️ Configurator")
     st.header("Building Parameters")
     
-    max_h = st.slider("Max Building Height (Units)", 1, 6, 3, help="Max number of blocks stacked vertically.")
-    target_gfa = st.slider("Target GFA (Total Blocks)", 1, 25, 12, help="Total number of modular units in the asset.")
-    
+    max_h = st.slider("Max Building Height (Units)", 1, 40, 3, help="Max number of blocks stacked vertically.")
+    target_gfa = st.slider("Target GFA (Total Blocks)", 1, 50_000, 12, help="Total number of modular units in the asset.")
+
+    footprint = st.selectbox("Footprint", FOOTPRINTS, help="L-shaped leaves the far corner quadrant of the grid empty.")
+    height_profile = st.selectbox("Height Profile", HEIGHT_PROFILES,
+                                  help="Terraced steps the column height limit down from the max height at the origin corner to 1 storey.")
+    aspect = st.slider("Footprint Aspect (x : y)", 0.5, 4.0, 1.0, 0.25, help="Grid columns in x per grid column in y.")
+
     st.divider()
     st.info("💡 Adjust height and GFA to see how footprint area scales automatically.")
 
 # --- 4. COMPUTATIONAL LOGIC (Building Generation) ---
-def generate_building_layout(total_units, max_height):
-    # Block Dimensions (1:3:1 Horizontal Ratio)
-    W, L, H = 1, 3, 1
-    
-    # Calculate footprint requirements
-    cols_count = int(np.ceil(total_units / max_height))
-    grid_side = int(np.ceil(np.sqrt(cols_count)))
-    
-    coords = []
-    placed = 0
-    for i in range(grid_side):
-        for j in range(grid_side):
-            for k in range(max_height):
-                if placed < total_units:
-                    coords.append((i * W, j * L, k * H))
-                    placed += 1
-    return coords, (W, L, H), cols_count
-
-block_coords, dims, footprint_area = generate_building_layout(target_gfa, max_h)
+# vectorized, see modular_geometry.building_layout
+layout = building_layout(target_gfa, max_h, footprint=footprint, profile=height_profile, aspect=aspect)
 
 # --- 5. 3D VISUALIZATION ENGINE ---
 def create_3d_viz(blocks, w, l, h):
-    fig = go.Figure()
-    
-    for x, y, z in blocks:
-        # Add Semi-transparent Volume
-        fig.add_trace(go.Mesh3d(
-            x=[x, x+w, x+w, x, x, x+w, x+w, x],
-            y=[y, y, y+l, y+l, y, y, y+l, y+l],
-            z=[z, z, z, z, z+h, z+h, z+h, z+h],
-            i=[7, 0, 0, 0, 4, 4, 6, 6, 4, 0, 3, 2],
-            j=[3, 4, 1, 2, 5, 6, 5, 2, 0, 1, 6, 3],
-            k=[0, 7, 2, 3, 6, 7, 1, 1, 5, 5, 7, 6],
-            opacity=0.4, color='#cbd5e1', flatshading=True, showlegend=False, hoverinfo='none'
-        ))
-
-        # Add High-Contrast Wireframe
-        lx, ly, lz = [], [], []
-        edges = [
-            ((0,0,0),(w,0,0)), ((w,0,0),(w,l,0)), ((w,l,0),(0,l,0)), ((0,l,0),(0,0,0)),
-            ((0,0,h),(w,0,h)), ((w,0,h),(w,l,h)), ((w,l,h),(0,l,h)), ((0,l,h),(0,0,h)),
-            ((0,0,0),(0,0,h)), ((w,0,0),(w,0,h)), ((w,l,0),(w,l,h)), ((0,l,0),(0,l,h))
-        ]
-        for s, e in edges:
-            lx.extend([x+s[0], x+e[0], None]); ly.extend([y+s[1], y+e[1], None]); lz.extend([z+s[2], z+e[2], None])
-        
-        fig.add_trace(go.Scatter3d(
-            x=lx, y=ly, z=lz, mode='lines', 
-            line=dict(color='#1e293b', width=4), showlegend=False, hoverinfo='none'
-        ))
+    # Semi-transparent volumes + high-contrast wireframe of all blocks as two traces
+    fig = go.Figure(building_traces(blocks, (w, l, h)))
 
     fig.update_layout(
         margin=dict(l=0, r=0, t=0, b=0), height=550, paper_bgcolor='white',
@@ -125,13 +91,15 @@ st.markdown("Exploring spatial efficiency using **Modular Units** | Project: B+G
 col_viz, col_metrics = st.columns([3, 1])
 
 with col_viz:
-    st.plotly_chart(create_3d_viz(block_coords, *dims), use_container_width=True)
+    st.plotly_chart(create_3d_viz(layout.coords, *layout.dims), use_container_width=True)
 
 with col_metrics:
     st.subheader("Asset Breakdown")
-    st.metric("Total Modular Units", target_gfa)
-    st.metric("Footprint Area", f"{footprint_area} units")
-    st.metric("Total Height", f"{max_h} levels")
+    st.metric("Total Modular Units", f"{layout.n_units:,}")
+    st.metric("Footprint Area", f"{layout.footprint_columns:,} units")
+    st.metric("Total Height", f"{layout.max_storeys} levels")
+    st.metric("Average Height", f"{layout.mean_storeys:.1f} levels")
+    st.caption(f"Grid {layout.grid[0]} x {layout.grid[1]} | {layout.coverage:.0%} of the footprint cells used")
     st.divider()
     st.caption("Stack height to be verified with structural laod takedown.")
 
@@ -197,15 +165,33 @@ with tab_perf:
         st.plotly_chart(fig_rad, use_container_width=True)
 
 with tab_logic:
-    st.markdown("""
-        <div class="selection-banner">
-            <h3>Final Recommendation: Semi-Precast System</h3>
-            <p>Selected for optimal balance of <b>regional logistics</b> and <b>onsite speed</b>. 
-            Reduces formwork labor by 60% compared to in-situ while avoiding the 'empty-air' transport 
-            costs of full volumetric boxes.</p>
-        </div>
-    """, unsafe_allow_html=True)
-    
+    st.markdown("##### Criteria Weights")
+    w_cols = st.columns(len(CRITERIA))
+    weights = tuple(col.slider(c, 0.0, 5.0, 1.0, 0.5, key=f"w_{c}") for col, c in zip(w_cols, CRITERIA))
+    concentration = st.slider("Confidence in Weights", 2, 200, 20,
+                              help="Monte Carlo sensitivity: sampled weights follow a Dirichlet distribution around the sliders, higher keeps them closer.")
+
+    if sum(weights) == 0:
+        st.warning("Set at least one criteria weight above 0.")
+    else:
+        ranking = cache.get_or_compute(
+            make_key("mmc_rank", hash_frame(DF_MATRIX), weights, concentration),
+            lambda: rank_systems(DF_MATRIX, weights, concentration),
+        )
+        best_system, best_reason = recommendation(ranking)
+        st.markdown(f"""
+            <div class="selection-banner">
+                <h3>Final Recommendation: {best_system}</h3>
+                <p>{best_reason}</p>
+            </div>
+        """, unsafe_allow_html=True)
+        st.dataframe(
+            ranking.table(),
+            hide_index=True,
+            use_container_width=True,
+            column_config={"P(first)": st.column_config.ProgressColumn("P(first)", format="percent", min_value=0.0, max_value=1.0)},
+        )
+
     table_logic = {
         "System": ["Semi-Precast", "In-Situ Slab", "Steel/Hollowcore", "Volumetric"],
         "Strategic Benefit": ["Balance of Risk/Cost", "Low direct material cost", "Design Flexibility", "Max Speed/Zero Waste"],
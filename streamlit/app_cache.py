@@ -0,0 +1,129 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Content-hash cache for parsed uploads and computed results.
+
+Keys are built from the hash of the uploaded bytes (or of the edited
+table) plus the design parameters, so a rerun caused by an unrelated
+widget finds the previous result. The cache is a plain thread-safe LRU
+with an entry limit and a size limit; the apps share one instance per
+server process through st.cache_resource.
+
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISSING = object()
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame (values, index and column names)."""
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def make_key(*parts) -> str:
+    """Stable key from hashes and plain parameter values (lists are order-sensitive)."""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def sizeof(value) -> int:
+    """Approximate memory footprint used for the size-based eviction."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and total size in bytes."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+    def put(self, key, value):
+        size = sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                # Never cache something bigger than the whole budget
+                return value
+            self._data[key] = (value, size)
+            self._bytes += size
+            self._evict()
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing it with compute() on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size) = self._data.popitem(last=False)
+            self._bytes -= size
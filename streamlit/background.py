@@ -0,0 +1,135 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Background jobs for the long calculations of the Streamlit apps.
+
+A job runs on a thread pool shared by the server process (the apps hold
+it through st.cache_resource) and its handle is kept in st.session_state,
+so a rerun caused by any widget finds the running job instead of starting
+the work again. Calculations go through their table in row chunks: the
+job counts the rows after each chunk and stops at the next chunk boundary
+once it is cancelled. The UI polls the handle (st.fragment with
+run_every) and reruns the page when the job has finished; the result
+itself goes into the shared LRUCache under the job key.
+
+Job functions run without a script context, so they must not call st.*
+and get every input as an argument.
+
+"""
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+MAX_WORKERS = 2
+CHUNK_ROWS = 10_000
+POLL_S = 0.5
+
+# smaller tables are calculated inline, a background job only pays off for long runs
+BACKGROUND_MIN_ROWS = 20_000
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at the next chunk boundary after Job.cancel()."""
+
+
+def make_executor(max_workers: int = MAX_WORKERS) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="designflow-job")
+
+
+@dataclass(eq=False)
+class Job:
+    key: str
+    label: str = ""
+    total: int = 0          # rows to process, 0 while unknown
+    done: int = 0           # rows processed so far
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = None
+    future: object = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def fraction(self) -> float:
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()  # a job still waiting for a worker never starts
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"{self.label or 'Job'} cancelled")
+
+    def advance(self, rows: int):
+        """Count rows as done; raises JobCancelled once cancel() was called."""
+        self.done += rows
+        self.check()
+
+    def track(self, chunks):
+        """Pass chunks through, counting their rows; stops before the next chunk once cancelled."""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+            self.done += len(chunk)
+
+    def result(self):
+        """Return value of the job function; raises JobCancelled or the job's own error."""
+        try:
+            return self.future.result()
+        except CancelledError:
+            raise JobCancelled(f"{self.label or 'Job'} cancelled") from None
+
+    def status_text(self) -> str:
+        rows = f"{self.done:,} of {self.total:,} rows" if self.total else f"{self.done:,} rows"
+        return f"{self.label}: {rows} ({self.elapsed:.0f} s)"
+
+
+def submit(executor: ThreadPoolExecutor, key: str, fn, *args, label: str = "") -> Job:
+    """Start fn(job, *args) on the executor, the returned handle goes into session state."""
+    job = Job(key, label)
+
+    def run():
+        try:
+            return fn(job, *args)
+        finally:
+            job.finished = time.perf_counter()
+
+    job.future = executor.submit(run)
+    return job
+
+
+def run_inline(key: str, fn, *args, label: str = ""):
+    """fn(job, *args) on the calling thread, for tables too small for a background job."""
+    return fn(Job(key, label), *args)
+
+
+def in_chunks(df: pd.DataFrame, compute, job: Job, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """compute(part) over row chunks of df with the job's progress / cancellation in between."""
+    if len(df) <= chunk_rows:
+        job.total += len(df)
+        out = compute(df)
+        job.advance(len(df))
+        return out
+    job.total += len(df)
+    parts = []
+    for start in range(0, len(df), chunk_rows):
+        part = df.iloc[start:start + chunk_rows]
+        parts.append(compute(part))
+        job.advance(len(part))
+    return pd.concat(parts)
@@ -0,0 +1,202 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Headless batch run of the column schedule and corbel calculations.
+
+Run with:
+
+python batch_run.py path/to/rfem_exports -o path/to/results
+
+Every .xlsx in the folder is treated as a column schedule input (same
+columns as the Column Schedule app), every .csv as a corbel load table
+(same columns as the Corbel Design App upload). Files are spread over a
+process pool sized to the available cores; each worker streams its file
+chunk by chunk through the same calculation modules the apps use and
+writes one result CSV. The run ends with a throughput summary, which is
+also written to batch_summary.json in the output folder.
+
+Load-combination exports are enveloped like in the apps (envelope.py):
+corbel loads to the governing combination per Location, schedules with a
+Combination column to the max / min NEd_kN per column and section. Only
+the running envelope is kept while streaming. --no-envelope designs every
+row as it is (the apps with their envelope switch off).
+
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from column_engine import iter_schedule
+from corbel_calc import iter_corbel_chunks, iter_csv_chunks
+from envelope import N_COMBINATIONS, column_envelope_chunks, corbel_envelope_chunks, needs_envelope
+from rfem_io import iter_xlsx_chunks
+
+SCHEDULE_SUFFIX = ".xlsx"
+CORBEL_SUFFIX = ".csv"
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def find_inputs(input_dir: Path, recursive: bool = False) -> list:
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        p for p in input_dir.glob(pattern)
+        if p.is_file() and p.suffix.lower() in (SCHEDULE_SUFFIX, CORBEL_SUFFIX) and not p.name.startswith("~$")
+    )
+
+
+def write_chunks(parts, out_path: Path) -> int:
+    """Write result chunks to one CSV as they come, returns the row count."""
+    rows = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        for part in parts:
+            part.to_csv(f, index=False, header=rows == 0)
+            rows += len(part)
+    return rows
+
+
+def schedule_chunks(path: Path, options: dict, info: dict):
+    """Schedule input chunks, reduced to the envelope when the export has a Combination column."""
+    chunks = iter_xlsx_chunks(path, chunksize=options["chunksize"])
+    first = next(chunks, None)
+    if first is None:
+        return iter(())
+    chunks = itertools.chain([first], chunks)
+    if not (options["envelope"] and needs_envelope(first)):
+        return chunks
+    env = column_envelope_chunks(chunks)
+    info["load_rows"] = int(env[N_COMBINATIONS].sum())
+    return iter([env])
+
+
+def process_file(path: Path, out_dir: Path, options: dict) -> dict:
+    """Run one export through the schedule or corbel calculation (executed in a worker process)."""
+    t0 = time.perf_counter()
+    info = {"file": str(path), "rows": 0, "load_rows": None, "seconds": 0.0, "error": None}
+    out_path = None
+    try:
+        geometry = (options["column_width"], options["corbel_height"], options["corbel_depth"], options["pad_offset"])
+        if path.suffix.lower() == SCHEDULE_SUFFIX:
+            info["kind"] = "schedule"
+            out_path = out_dir / f"{path.stem}_schedule.csv"
+            parts = iter_schedule(
+                schedule_chunks(path, options, info),
+                options["default_bar_diam"],
+                bar_diams=options["bar_diams"],
+                optimise=options["optimise"],
+            )
+        elif options["envelope"]:
+            info["kind"] = "corbel"
+            out_path = out_dir / f"{path.stem}_corbel.csv"
+            env = corbel_envelope_chunks(iter_csv_chunks(path, chunksize=options["chunksize"]), *geometry)
+            info["load_rows"] = int(env[N_COMBINATIONS].sum())
+            parts = [env]
+        else:
+            info["kind"] = "corbel"
+            out_path = out_dir / f"{path.stem}_corbel.csv"
+            parts = iter_corbel_chunks(iter_csv_chunks(path, chunksize=options["chunksize"]), *geometry)
+        info["rows"] = write_chunks(parts, out_path)
+        info["output"] = str(out_path)
+    except Exception as e:  # one bad export must not stop the nightly run
+        info["error"] = f"{type(e).__name__}: {e}"
+        if out_path is not None and out_path.exists():
+            out_path.unlink()  # no half-written results
+    info["seconds"] = time.perf_counter() - t0
+    return info
+
+
+def run_batch(files, out_dir: Path, options: dict, workers: int) -> dict:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers, len(files)))
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, path, out_dir, options) for path in files]
+        for future in as_completed(futures):
+            info = future.result()
+            status = "FAILED " + info["error"] if info["error"] else f"{info['rows']} rows"
+            if not info["error"] and info["load_rows"] is not None:
+                status += f" (envelope of {info['load_rows']:,} load rows)"
+            print(f"  {Path(info['file']).name}: {status} ({info['seconds']:.2f} s)", flush=True)
+            results.append(info)
+    wall = time.perf_counter() - t0
+
+    rows = sum(r["rows"] for r in results)
+    summary = {
+        "files": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "rows": rows,
+        "workers": workers,
+        "seconds": wall,
+        "rows_per_s": rows / wall if wall > 0 else 0.0,
+        "files_per_s": len(results) / wall if wall > 0 else 0.0,
+        "results": sorted(results, key=lambda r: r["file"]),
+    }
+    with open(out_dir / "batch_summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch column schedules (.xlsx) and corbel designs (.csv) from RFEM exports.")
+    parser.add_argument("input_dir", type=Path, help="folder with RFEM exports")
+    parser.add_argument("-o", "--output-dir", type=Path, default=None, help="result folder (default: <input_dir>/results)")
+    parser.add_argument("-w", "--workers", type=int, default=available_cores(), help="worker processes (default: available cores)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="also search sub-folders")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per chunk")
+    parser.add_argument("--no-envelope", dest="envelope", action="store_false",
+                        help="design every load row, no envelope over load combinations")
+
+    col = parser.add_argument_group("column schedule")
+    col.add_argument("--bar-diams", type=float, nargs="+", default=[12, 16, 20, 25], help="allowed bar diameters [mm]")
+    col.add_argument("--default-bar-diam", type=float, default=12, help="bar diameter for minimum detailing [mm]")
+    col.add_argument("--optimise", action="store_true", help="optimise the layout over --bar-diams")
+
+    cor = parser.add_argument_group("corbel")
+    cor.add_argument("--column-width", type=float, default=80, help="column size [cm]")
+    cor.add_argument("--pad-offset", type=float, default=5, help="pad offset [cm]")
+    cor.add_argument("--corbel-height", type=float, default=65, help="corbel height [cm]")
+    cor.add_argument("--corbel-depth", type=float, default=40, help="corbel depth [cm]")
+    args = parser.parse_args(argv)
+
+    out_dir = args.output_dir or args.input_dir / "results"
+    # results of an earlier run are not inputs
+    files = [p for p in find_inputs(args.input_dir, args.recursive) if out_dir.resolve() not in p.resolve().parents]
+    if not files:
+        print(f"No .xlsx/.csv files in {args.input_dir}")
+        return 1
+
+    options = {
+        "chunksize": args.chunksize,
+        "envelope": args.envelope,
+        "bar_diams": args.bar_diams,
+        "default_bar_diam": args.default_bar_diam,
+        "optimise": args.optimise,
+        "column_width": args.column_width,
+        "pad_offset": args.pad_offset,
+        "corbel_height": args.corbel_height,
+        "corbel_depth": args.corbel_depth,
+    }
+
+    print(f"{len(files)} file(s), {min(args.workers, len(files))} worker(s) -> {out_dir}")
+    summary = run_batch(files, out_dir, options, args.workers)
+    print(
+        f"Done: {summary['files']} files ({summary['failed']} failed), {summary['rows']:,} rows "
+        f"in {summary['seconds']:.2f} s | {summary['rows_per_s']:,.0f} rows/s | {summary['files_per_s']:.2f} files/s"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
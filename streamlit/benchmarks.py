@@ -0,0 +1,273 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Benchmarks of the calculation and rendering hot paths, no Streamlit server.
+
+Run with:
+
+python benchmarks.py                            # 10 ... 1M rows
+python benchmarks.py --max-rows 100000 -k corbel
+python benchmarks.py --json bench.json          # save the run
+python benchmarks.py --compare bench.json       # exit 1 on a regression
+
+Every benchmark gets synthetic inputs of 10, 100, ... up to 1,000,000
+rows (units for the modular layout). The pure-Python xlsx paths and the
+scalar corbel loop stop at a lower size by default. Each case is timed as
+the best of a few repeats (setup excluded), then run once more under
+tracemalloc for the peak memory, since tracemalloc slows Python-heavy code
+down too much to time it at the same time.
+
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from column_engine import (
+    circ_mask,
+    compute_schedule,
+    design_reinf,
+    optimise_reinf,
+    section_area_concrete_mm2,
+    validation_notes,
+)
+from corbel_calc import corbel_frame
+from corbel_core import calc_corbel
+from design_types import compute_schedule_by_type
+from envelope import column_envelope, corbel_envelope
+from modular_geometry import building_layout, building_traces
+from rfem_io import INPUT_COLUMNS, iter_xlsx_chunks
+from schedule_export import export_bytes
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BAR_DIAMS = (12, 16, 20, 25, 32)
+
+# regression if slower than the compared run by this factor (and by more than MIN_DELTA_S)
+TOLERANCE = 1.3
+MIN_DELTA_S = 0.005
+
+
+def schedule_input(n: int, seed: int = 0) -> pd.DataFrame:
+    """Random column schedule input, 30 % circular, every 1000th row without b_mm."""
+    rng = np.random.default_rng(seed)
+    circ = rng.random(n) < 0.3
+    df = pd.DataFrame({
+        "Column_ID": [f"C{i}" for i in range(n)],
+        "Shape": np.where(circ, "CIRC", "RECT"),
+        "b_mm": np.where(circ, np.nan, rng.integers(250, 600, n)).astype(float),
+        "h_mm": np.where(circ, np.nan, rng.integers(250, 600, n)).astype(float),
+        "D_mm": np.where(circ, rng.integers(300, 700, n), np.nan).astype(float),
+        "NEd_kN": rng.uniform(200, 6000, n),
+        "fck_MPa": rng.choice([30.0, 40.0, 50.0], n),
+        "cover_mm": 30.0,
+    })
+    df.loc[::1000, "b_mm"] = np.nan
+    return df
+
+
+def typical_schedule_input(n: int, seed: int = 0) -> pd.DataFrame:
+    """schedule_input with catalogue sections (50 / 100 mm steps), so column types repeat like in a building."""
+    df = schedule_input(n, seed)
+    return df.assign(b_mm=df["b_mm"] // 50 * 50, h_mm=df["h_mm"] // 50 * 50, D_mm=df["D_mm"] // 100 * 100)
+
+
+def corbel_loads(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "V": rng.uniform(50, 400, n).round(1),
+        "H": rng.uniform(0, 150, n).round(1),
+        "Location": [f"Corbel {i}" for i in range(n)],
+    })
+
+
+def with_combinations(df: pd.DataFrame, by: str, per_member: int = 100, loads=("V", "H", "NEd_kN")) -> pd.DataFrame:
+    """
+    Long format: the rows become `per_member` load combinations of
+    len(df) / per_member members, each member keeps the section of its first row.
+    """
+    n = len(df)
+    first = (np.arange(n) // per_member) * per_member
+    same = [c for c in df.columns if c not in loads]
+    long = df.assign(**{c: df[c].to_numpy()[first] for c in same})
+    return long.assign(Combination=[f"CO {i % per_member + 1}" for i in range(n)])
+
+
+def xlsx_input(df: pd.DataFrame) -> bytes:
+    import xlsxwriter
+
+    buf = io.BytesIO()
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True, "nan_inf_to_errors": True})
+    ws = wb.add_worksheet()
+    ws.write_row(0, 0, INPUT_COLUMNS)
+    cols = [df[c].to_numpy(dtype=object) for c in INPUT_COLUMNS]
+    for r, row in enumerate(zip(*cols), start=1):
+        ws.write_row(r, 0, [None if isinstance(v, float) and np.isnan(v) else v for v in row])
+    wb.close()
+    return buf.getvalue()
+
+
+def _reinf_setup(n):
+    df = schedule_input(n)
+    return df, circ_mask(df)
+
+
+# name -> (setup(n) -> state, run(state), default max rows)
+BENCHMARKS = {
+    "schedule.section_area": (_reinf_setup, lambda s: section_area_concrete_mm2(*s), None),
+    "schedule.design_reinf": (_reinf_setup, lambda s: design_reinf(s[0], 12, s[1]), None),
+    "schedule.optimise_reinf": (_reinf_setup, lambda s: optimise_reinf(s[0], BAR_DIAMS, is_circ=s[1]), None),
+    "schedule.validation_notes": (_reinf_setup, lambda s: validation_notes(*s), None),
+    "schedule.compute": (schedule_input, lambda df: compute_schedule(df, 12, BAR_DIAMS, optimise=True), None),
+    "schedule.compute_typical": (
+        typical_schedule_input,
+        lambda df: compute_schedule(df, 12, BAR_DIAMS, optimise=True),
+        None,
+    ),
+    "schedule.compute_by_type": (
+        typical_schedule_input,
+        lambda df: compute_schedule_by_type(df, 12, BAR_DIAMS, optimise=True, band_kN=100.0),
+        None,
+    ),
+    "corbel.calc_vectorized": (
+        corbel_loads,
+        lambda df: calc_corbel(df["V"].to_numpy(), df["H"].to_numpy(), 80, 65, 40, 5),
+        None,
+    ),
+    "corbel.frame": (corbel_loads, lambda df: corbel_frame(df, 80, 65, 40, 5), None),
+    # one call per load like the VIKTOR Controller.calc_corbel
+    "corbel.calc_scalar_loop": (
+        lambda n: corbel_loads(n)[["V", "H"]].to_numpy().tolist(),
+        lambda loads: [float(calc_corbel(V, H, 80, 65, 40, 5).As1) for V, H in loads],
+        100_000,
+    ),
+    "envelope.corbel": (
+        lambda n: with_combinations(corbel_loads(n), "Location"),
+        lambda df: corbel_envelope(df, 80, 65, 40, 5),
+        None,
+    ),
+    "envelope.column": (lambda n: with_combinations(schedule_input(n), "Column_ID"), column_envelope, None),
+    "modular.layout": (lambda n: n, lambda n: building_layout(n, 12, "L-shaped", "Terraced", aspect=2.0), None),
+    "modular.traces": (
+        lambda n: building_layout(n, 12, "L-shaped", "Terraced", aspect=2.0),
+        lambda layout: building_traces(layout.coords, layout.dims),
+        100_000,
+    ),
+    "xlsx.read": (lambda n: xlsx_input(schedule_input(n)), lambda data: sum(len(c) for c in iter_xlsx_chunks(io.BytesIO(data))), 100_000),
+    "xlsx.write_schedule": (
+        lambda n: compute_schedule(schedule_input(n), 12, BAR_DIAMS, optimise=True),
+        lambda out: export_bytes(out, "xlsx"),
+        10_000,
+    ),
+    "csv.write_schedule": (
+        lambda n: compute_schedule(schedule_input(n), 12, BAR_DIAMS, optimise=True),
+        lambda out: export_bytes(out, "csv"),
+        None,
+    ),
+}
+
+
+def time_case(run, state, repeats: int, budget_s: float) -> float:
+    best = float("inf")
+    spent = 0.0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        run(state)
+        dt = time.perf_counter() - t0
+        best = min(best, dt)
+        spent += dt
+        if spent > budget_s:
+            break
+    return best
+
+
+def peak_case(run, state) -> float:
+    tracemalloc.start()
+    try:
+        run(state)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(names, max_rows: int, repeats: int, memory: bool, full: bool) -> list:
+    results = []
+    for name in names:
+        setup, run, cap = BENCHMARKS[name]
+        for n in SIZES:
+            if n > max_rows or (cap is not None and n > cap and not full):
+                continue
+            state = setup(n)
+            seconds = time_case(run, state, repeats, budget_s=2.0)
+            r = {
+                "name": name,
+                "rows": n,
+                "seconds": seconds,
+                "rows_per_s": n / seconds if seconds > 0 else float("inf"),
+                "peak_mb": peak_case(run, state) if memory else None,
+            }
+            results.append(r)
+            peak = f"{r['peak_mb']:9.1f} MB" if memory else ""
+            print(f"{name:28s} {n:>9,} rows {seconds * 1000:11.2f} ms {r['rows_per_s']:14,.0f} rows/s {peak}", flush=True)
+    return results
+
+
+def compare(results: list, old: dict) -> list:
+    before = {(r["name"], r["rows"]): r for r in old["results"]}
+    out = []
+    for r in results:
+        o = before.get((r["name"], r["rows"]))
+        if o and r["seconds"] > o["seconds"] * TOLERANCE and r["seconds"] - o["seconds"] > MIN_DELTA_S:
+            out.append(f"{r['name']} @ {r['rows']:,}: {r['seconds'] * 1000:.2f} ms (was {o['seconds'] * 1000:.2f} ms, "
+                       f"x{r['seconds'] / o['seconds']:.2f})")
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the calculation / rendering hot paths.")
+    parser.add_argument("-k", "--select", default="", help="only benchmarks whose name contains this text")
+    parser.add_argument("--max-rows", type=int, default=max(SIZES), help="largest input size")
+    parser.add_argument("--full", action="store_true", help="ignore the per-benchmark size caps (slow xlsx paths)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed repeats per case (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--json", type=Path, default=None, help="write the results to this file")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier --json output, exit 1 on a regression")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if args.select in n]
+    if not names:
+        print(f"No benchmark matches '{args.select}'")
+        return 1
+
+    results = run_benchmarks(names, args.max_rows, args.repeats, not args.no_memory, args.full)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.compare:
+        found = compare(results, json.loads(args.compare.read_text(encoding="utf-8")))
+        for line in found:
+            print("REGRESSION " + line)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Columnar design engine for the column schedule.
+
+Every function works on a whole table at once (NumPy / pandas array
+operations, no apply or iterrows), so the schedule scales linearly with
+the number of column rows.
+
+"""
+import numpy as np
+import pandas as pd
+
+RECT_SHAPES = ("RECT", "SQUARE")
+CIRC_SHAPES = ("CIRC", "CIRCULAR", "ROUND")
+
+# Minimum detailing from the guidance note [1]
+MIN_BARS_RECT = 4
+MIN_BARS_CIRC = 6
+MIN_BAR_DIAM_MM = 12.0
+
+# Material / section limits for the optimised selection (EC2 9.5.2)
+GAMMA_C = 1.5
+ALPHA_CC = 0.85
+FYD_MPA = 500 / 1.15  # B500B
+RHO_MIN = 0.002
+RHO_MAX = 0.04
+MAX_BARS = 24
+
+# Rows per broadcast block, keeps the candidate grid at a few hundred MB max
+OPT_BLOCK_ROWS = 100_000
+
+NOTE_MISSING_D = "Missing D_mm for circular column"
+NOTE_MISSING_BH = "Missing b_mm/h_mm for rectangular column"
+NOTE_NO_LAYOUT = "No layout in allowed bar set satisfies As_req"
+NOTE_MISSING_NED = "Missing NEd_kN, minimum detailing only"
+NOTE_UNKNOWN_SHAPE = "Unknown Shape, designed as rectangular"
+
+
+def numeric_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Column as float64 array, missing column / None / text -> NaN."""
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def circ_mask(df: pd.DataFrame) -> np.ndarray:
+    # RECT/SQUARE and unknowns are treated as rectangular
+    return df["Shape"].isin(CIRC_SHAPES).to_numpy(dtype=bool)
+
+
+def min_bars_for_shape(is_circ: np.ndarray) -> np.ndarray:
+    # From context: min 4 in square, 6 in circular [1].
+    return np.where(is_circ, MIN_BARS_CIRC, MIN_BARS_RECT)
+
+
+def area_of_bar_mm2(d_mm):
+    return np.pi * np.square(d_mm) / 4.0
+
+
+def section_area_concrete_mm2(df: pd.DataFrame, is_circ: np.ndarray = None) -> np.ndarray:
+    if is_circ is None:
+        is_circ = circ_mask(df)
+    D = numeric_column(df, "D_mm")
+    b = numeric_column(df, "b_mm")
+    h = numeric_column(df, "h_mm")
+    # NaN geometry propagates to NaN area, same as the old per-row check
+    return np.where(is_circ, np.pi * np.square(D) / 4.0, b * h)
+
+
+def design_reinf(df: pd.DataFrame, chosen_d_mm: float, is_circ: np.ndarray = None) -> pd.DataFrame:
+    if is_circ is None:
+        is_circ = circ_mask(df)
+
+    # Minimum bar diameter 12mm per context [1]
+    d_mm = max(float(chosen_d_mm), MIN_BAR_DIAM_MM)
+
+    # Placeholder: just provide minimum detailing reinforcement.
+    n_bars = min_bars_for_shape(is_circ)
+    return pd.DataFrame(
+        {
+            "n_bars": n_bars,
+            "bar_diam_mm": np.full(len(df), d_mm),
+            "As_provided_mm2": n_bars * area_of_bar_mm2(d_mm),
+        },
+        index=df.index,
+    )
+
+
+def required_steel_area_mm2(NEd_kN, fck_MPa, Ac_mm2) -> np.ndarray:
+    """
+    Required longitudinal steel for a concentric axial force.
+    NEd > 0 is compression: As = (NEd - fcd*Ac)/fyd, at least EC2 9.5.2(2)
+    As_min = max(0.10*NEd/fyd, 0.002*Ac). NEd < 0 (tension): As = |NEd|/fyd.
+    """
+    NEd_N = np.asarray(NEd_kN, dtype=float) * 1e3
+    Ac_mm2 = np.asarray(Ac_mm2, dtype=float)
+    fcd = ALPHA_CC * np.asarray(fck_MPa, dtype=float) / GAMMA_C
+
+    As_comp = np.maximum((NEd_N - fcd * Ac_mm2) / FYD_MPA, 0.0)
+    As_tens = np.maximum(-NEd_N / FYD_MPA, 0.0)
+    As_min = np.maximum(0.10 * np.abs(NEd_N) / FYD_MPA, RHO_MIN * Ac_mm2)
+    return np.maximum(np.maximum(As_comp, As_tens), As_min)
+
+
+def candidate_layouts(bar_diams):
+    """Diameter / count axes of the search grid and the steel area of each pair."""
+    diams = np.unique(np.maximum(np.asarray(bar_diams, dtype=float), MIN_BAR_DIAM_MM))
+    counts = np.arange(MIN_BARS_RECT, MAX_BARS + 1)
+    As_grid = counts[np.newaxis, :] * area_of_bar_mm2(diams)[:, np.newaxis]  # (diams, counts)
+    return diams, counts, As_grid
+
+
+def optimise_reinf(df: pd.DataFrame, bar_diams, Ac_mm2: np.ndarray = None, is_circ: np.ndarray = None):
+    """
+    Lightest (diameter, bar count) layout per row out of the allowed set.
+
+    The (rows x diameters x counts) grid is evaluated as one broadcast per
+    block of OPT_BLOCK_ROWS rows. A layout passes if it has at least the
+    minimum bar count for the shape (even counts for rectangular sections),
+    As >= As_req and As <= 0.04*Ac. Rows without a passing layout fall back
+    to the heaviest admissible layout (minimum detailing if none is
+    admissible) and get a note. Rows without geometry or NEd_kN keep the
+    minimum detailing.
+
+    Returns (reinf DataFrame, notes array).
+    """
+    if is_circ is None:
+        is_circ = circ_mask(df)
+    if Ac_mm2 is None:
+        Ac_mm2 = section_area_concrete_mm2(df, is_circ)
+
+    NEd_kN = numeric_column(df, "NEd_kN")
+    As_req = required_steel_area_mm2(NEd_kN, numeric_column(df, "fck_MPa"), Ac_mm2)
+    As_max = RHO_MAX * Ac_mm2
+    diams, counts, As_grid = candidate_layouts(bar_diams)
+    n_d, n_n = As_grid.shape
+
+    # Allowed counts per shape: circular >= 6, rectangular >= 4 and symmetric
+    count_ok_circ = counts >= MIN_BARS_CIRC
+    count_ok_rect = (counts >= MIN_BARS_RECT) & (counts % 2 == 0)
+
+    n_rows = len(df)
+    best = np.empty(n_rows, dtype=np.int64)
+    found = np.empty(n_rows, dtype=bool)
+    fits = np.empty(n_rows, dtype=bool)
+    for start in range(0, n_rows, OPT_BLOCK_ROWS):
+        sl = slice(start, start + OPT_BLOCK_ROWS)
+        count_ok = np.where(is_circ[sl, np.newaxis], count_ok_circ, count_ok_rect)  # (rows, counts)
+        admissible = count_ok[:, np.newaxis, :] & (As_grid <= As_max[sl, np.newaxis, np.newaxis])
+        passing = admissible & (As_grid >= As_req[sl, np.newaxis, np.newaxis])
+
+        # Lightest = least steel area (same bar length); flat argmin over (diams, counts)
+        score = np.where(passing, As_grid, np.inf).reshape(-1, n_d * n_n)
+        best_blk = score.argmin(axis=1)
+        found_blk = np.isfinite(score[np.arange(len(best_blk)), best_blk])
+
+        # Fallback: heaviest layout that still fits in the section
+        fallback = np.where(admissible, As_grid, -np.inf).reshape(-1, n_d * n_n).argmax(axis=1)
+        best[sl] = np.where(found_blk, best_blk, fallback)
+        found[sl] = found_blk
+        fits[sl] = admissible.reshape(-1, n_d * n_n).any(axis=1)
+
+    d_idx, n_idx = np.divmod(best, n_n)
+    n_bars = counts[n_idx]
+    bar_diam = diams[d_idx]
+
+    # No geometry / no NEd -> nothing to optimise against, and nothing admissible
+    # (section too small for the minimum bars) -> keep minimum detailing
+    no_geom = np.isnan(Ac_mm2)
+    no_ned = np.isnan(NEd_kN)
+    minimum = no_geom | no_ned | ~fits
+    n_bars = np.where(minimum, min_bars_for_shape(is_circ), n_bars)
+    bar_diam = np.where(minimum, diams[0], bar_diam)
+
+    reinf = pd.DataFrame(
+        {
+            "n_bars": n_bars,
+            "bar_diam_mm": bar_diam,
+            "As_provided_mm2": n_bars * area_of_bar_mm2(bar_diam),
+            "As_required_mm2": As_req,
+        },
+        index=df.index,
+    )
+    notes = np.select(
+        [no_geom, no_ned, ~found],
+        ["", NOTE_MISSING_NED, NOTE_NO_LAYOUT],
+        default="",
+    ).astype(object)
+    return reinf, notes
+
+
+def validation_notes(df: pd.DataFrame, is_circ: np.ndarray = None) -> np.ndarray:
+    if is_circ is None:
+        is_circ = circ_mask(df)
+    missing_d = np.isnan(numeric_column(df, "D_mm"))
+    missing_bh = np.isnan(numeric_column(df, "b_mm")) | np.isnan(numeric_column(df, "h_mm"))
+    shape = df["Shape"]
+    unknown = (shape.notna() & ~shape.isin(RECT_SHAPES + CIRC_SHAPES)).to_numpy(dtype=bool)
+    notes = np.select(
+        [is_circ & missing_d, ~is_circ & missing_bh],
+        [NOTE_MISSING_D, NOTE_MISSING_BH],
+        default="",
+    ).astype(object)
+    return join_notes(np.where(unknown, NOTE_UNKNOWN_SHAPE, ""), notes)
+
+
+def join_notes(*notes: np.ndarray) -> np.ndarray:
+    """Element-wise '; '-join of note arrays, skipping empty entries."""
+    out = notes[0]
+    for extra in notes[1:]:
+        both = (out != "") & (extra != "")
+        out = np.where(both, out + "; " + extra, np.where(out != "", out, extra))
+    return out.astype(object)
+
+
+def compute_schedule(df: pd.DataFrame, chosen_d_mm: float, bar_diams=None, optimise: bool = False) -> pd.DataFrame:
+    """
+    Input table -> input columns + Ac_mm2, n_bars, bar_diam_mm, As_provided_mm2, Notes.
+    With optimise=True the layout is searched over bar_diams and As_required_mm2 is added.
+    """
+    out = df.copy()
+    is_circ = circ_mask(out)
+
+    out["Ac_mm2"] = section_area_concrete_mm2(out, is_circ)
+    notes = validation_notes(out, is_circ)
+    if optimise:
+        reinf, design_notes = optimise_reinf(out, bar_diams or [chosen_d_mm], out["Ac_mm2"].to_numpy(), is_circ)
+        notes = join_notes(notes, design_notes)
+    else:
+        reinf = design_reinf(out, chosen_d_mm, is_circ)
+    for c in reinf.columns:
+        out[c] = reinf[c]
+    out["Notes"] = notes
+    return out
+
+
+def iter_schedule(chunks, chosen_d_mm: float, bar_diams=None, optimise: bool = False):
+    """compute_schedule over an iterable of input chunks (e.g. rfem_io.iter_xlsx_chunks)."""
+    for chunk in chunks:
+        yield compute_schedule(chunk, chosen_d_mm, bar_diams=bar_diams, optimise=optimise)
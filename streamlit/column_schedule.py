@@ -7,15 +7,47 @@ Run Program with following command:
 streamlit run column_schedule.py
 
 """
-import io
 import streamlit as st
 import pandas as pd
-import math
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from app_cache import LRUCache, hash_bytes, hash_frame, make_key
+from background import (
+    BACKGROUND_MIN_ROWS,
+    POLL_S,
+    Job,
+    JobCancelled,
+    in_chunks,
+    make_executor,
+    run_inline,
+    submit,
+)
+from design_types import NED_BAND_KN, column_type_schedule, compute_schedule_by_type
+from envelope import attach_member_forces, column_envelope, needs_envelope
+from incremental import recompute_changed
+from rf5_io import read_rf5_schedule
+from rfem_io import read_member_forces, read_uploaded_xlsx
+from schedule_export import FORMATS, export_bytes, parquet_available
+from table_schema import SCHEDULE_RESULT_SCHEMA, SCHEDULE_SCHEMA, apply_schema
 
 # Set page title and icon
 st.set_page_config(page_title="Column Schedule", page_icon=":heart:")
 
+
+@st.cache_resource
+def shared_cache() -> LRUCache:
+    # One cache per server process, shared by all sessions
+    return LRUCache()
+
+
+@st.cache_resource
+def background_executor() -> ThreadPoolExecutor:
+    # Worker threads shared by all sessions, each session keeps its own job handle
+    return make_executor()
+
+
+cache = shared_cache()
+
 # Page title and description
 st.title("Automated Column Schedule Tool")
 st.markdown("")
@@ -34,7 +66,7 @@ user_input_rfem = st.sidebar.text_input("RFEM model name and version:", "BG_Buil
 
 st.subheader("Input RFEM data")
 
-uploaded = st.file_uploader("Upload RFEM input (.xlsx)", type=["xlsx"])
+uploaded = st.file_uploader("Upload RFEM input (.xlsx) or RFEM 5 model (.rf5)", type=["xlsx", "rf5"])
 
 DEFAULT_ROWS = 8
 default_df = pd.DataFrame(
@@ -49,6 +81,8 @@ default_df = pd.DataFrame(
         "cover_mm": [40] * DEFAULT_ROWS,            # nominal cover (example)
     }
 )
+# Typed like an upload (Shape as a RECT / CIRC / ... selectbox, Float32 numbers)
+default_df = apply_schema(default_df, SCHEDULE_SCHEMA, editable=True)
 
 st.subheader("Manual input (used only if no upload)")
 manual_df = st.data_editor(
@@ -58,32 +92,43 @@ manual_df = st.data_editor(
     hide_index=True,
 )
 
-def read_uploaded_xlsx(file) -> pd.DataFrame:
-    """
-    Expects columns similar to the manual input:
-    Column_ID, Shape, b_mm, h_mm, D_mm, NEd_kN, fck_MPa, cover_mm
-    """
-    df = pd.read_excel(file)
-
-    # Normalize column names (basic)
-    df.columns = [c.strip() for c in df.columns]
-
-    required = ["Column_ID", "Shape", "NEd_kN", "fck_MPa", "cover_mm"]
-    for c in required:
-        if c not in df.columns:
-            raise ValueError(f"Missing required column '{c}' in uploaded file.")
-
-    # Ensure optional geometry columns exist
-    for c in ["b_mm", "h_mm", "D_mm"]:
-        if c not in df.columns:
-            df[c] = None
-
-    return df
-
+input_hash = None
 if uploaded is not None:
     try:
-        input_df = read_uploaded_xlsx(uploaded)
-        st.success("Using uploaded Excel data (overrides manual input).")
+        # Parsed upload is cached by the hash of its bytes
+        upload_hash = hash_bytes(uploaded.getvalue())
+        if uploaded.name.lower().endswith(".rf5"):
+            # Vertical concrete members straight from the model file, no Excel export
+            rf5_cover = st.number_input("Nominal cover for the model columns (mm)", 10, 100, 40)
+            model_df = cache.get_or_compute(
+                make_key("upload_rf5", upload_hash, rf5_cover),
+                lambda: read_rf5_schedule(uploaded, cover_mm=rf5_cover),
+            )
+            st.success(f"Using {len(model_df)} columns from the RFEM model (overrides manual input).")
+            forces_file = st.file_uploader("RFEM member internal forces (.xlsx export of table 4.6), optional",
+                                           type=["xlsx"], key="rf5_forces")
+            if forces_file is not None:
+                forces_hash = hash_bytes(forces_file.getvalue())
+                forces = cache.get_or_compute(make_key("member_forces", forces_hash),
+                                              lambda: read_member_forces(forces_file))
+                # one row per column and load combination, reduced by the envelope below
+                input_df = attach_member_forces(model_df, forces)
+                input_hash = make_key("rf5_forces", upload_hash, rf5_cover, forces_hash)
+            else:
+                st.warning("The .rf5 file holds no calculation results: upload the member internal forces "
+                           "or enter the design axial force NEd_kN per column.")
+                input_df = st.data_editor(
+                    model_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    disabled=[c for c in model_df.columns if c != "NEd_kN"],
+                    key=f"rf5_{upload_hash}",
+                )
+        else:
+            # the whole table is held in memory (envelope, incremental recompute), batch_run.py streams
+            input_df = cache.get_or_compute(make_key("upload", upload_hash), lambda: read_uploaded_xlsx(uploaded))
+            input_hash = upload_hash
+            st.success("Using uploaded Excel data (overrides manual input).")
     except Exception as e:
         st.error(f"Could not read uploaded file: {e}")
         st.info("Falling back to manual input.")
@@ -91,8 +136,30 @@ if uploaded is not None:
 else:
     input_df = manual_df.copy()
 
-# Basic cleanup
-input_df["Shape"] = input_df["Shape"].astype(str).str.upper().str.strip()
+# Table schema (categorical Shape, Float32 numbers); uploads are typed already and pass through uncopied
+input_df = apply_schema(input_df, SCHEDULE_SCHEMA)
+if input_hash is None:
+    input_hash = hash_frame(input_df)
+
+use_envelope = needs_envelope(input_df) and st.checkbox(
+    "Envelope over load combinations",
+    value=True,
+    help="Rows with the same Column_ID and section are load combinations of one column: only the "
+         "max / min NEd_kN are designed. Off: every row is designed as it is.",
+)
+if use_envelope:
+    # Long format (one row per column and load combination): design only max / min NEd per column
+    long_df = input_df
+    input_df = cache.get_or_compute(make_key("column_envelope", input_hash), lambda: column_envelope(long_df))
+    input_hash = make_key("column_envelope", input_hash)
+    st.info(f"Envelope: {len(long_df):,} load rows -> {len(input_df):,} columns, "
+            f"designed for the governing max / min NEd_kN.")
+
+# e.g. .rf5 columns without member forces: the optimiser keeps minimum detailing for them
+n_missing_ned = int(input_df["NEd_kN"].isna().sum())
+if n_missing_ned:
+    st.warning(f"{n_missing_ned:,} of {len(input_df):,} columns have no NEd_kN: they get the minimum "
+               f"detailing only and are not optimised (see Notes).")
 
 st.subheader("Input data being used")
 st.dataframe(input_df, use_container_width=True)
@@ -122,86 +189,159 @@ if not bar_diams:
 
 default_bar_diam = st.selectbox("Default chosen bar diameter (mm)", options=sorted(bar_diams), index=0)
 
-def min_bars_for_shape(shape: str) -> int:
-    # From context: min 4 in square, 6 in circular [1].
-    if shape in ("CIRC", "CIRCULAR", "ROUND"):
-        return 6
-    # Treat RECT/SQUARE and unknowns as 4
-    return 4
-
-def area_of_bar_mm2(d_mm: float) -> float:
-    return math.pi * (d_mm ** 2) / 4.0
-
-def section_area_concrete_mm2(row) -> float:
-    shape = row["Shape"]
-    if shape in ("CIRC", "CIRCULAR", "ROUND"):
-        D = row.get("D_mm", None)
-        if pd.isna(D) or D is None:
-            return float("nan")
-        return math.pi * (float(D) ** 2) / 4.0
-    else:
-        b = row.get("b_mm", None)
-        h = row.get("h_mm", None)
-        if pd.isna(b) or pd.isna(h) or b is None or h is None:
-            return float("nan")
-        return float(b) * float(h)
-
-def design_reinf_for_row(row, chosen_d_mm: float):
-    shape = row["Shape"]
-    n_min = min_bars_for_shape(shape)
-
-    # Minimum bar diameter 12mm per context [1]
-    d_mm = max(float(chosen_d_mm), 12.0)
-
-    # Placeholder: just provide minimum detailing reinforcement.
-    n_bars = n_min
-    As_mm2 = n_bars * area_of_bar_mm2(d_mm)
-
-    return n_bars, d_mm, As_mm2
+reinf_mode = st.radio(
+    "Reinforcement selection",
+    ["Minimum detailing (default diameter)", "Optimise over allowed diameters"],
+    index=0,
+)
+optimise = reinf_mode.startswith("Optimise")
+if optimise:
+    st.markdown(
+        """
+- Required steel from the axial force: **As,req = max((NEd - fcd·Ac)/fyd, 0.10·NEd/fyd, 0.002·Ac)**
+  with fcd = 0.85·fck/1.5 and fyd = 500/1.15 MPa
+- Upper limit **As ≤ 0.04·Ac**, rectangular sections use an even bar count
+- The lightest (diameter, bar count) pair out of the allowed diameters is chosen per column
+"""
+    )
 
-generate = st.button("Generate column schedule")
 
-if generate:
-    out = input_df.copy()
-
-    # Compute geometry area
-    out["Ac_mm2"] = out.apply(section_area_concrete_mm2, axis=1)
-
-    # Compute reinforcement
-    results = out.apply(lambda r: design_reinf_for_row(r, default_bar_diam), axis=1, result_type="expand")
-    results.columns = ["n_bars", "bar_diam_mm", "As_provided_mm2"]
-    out = pd.concat([out, results], axis=1)
-
-    # Simple notes / validation
-    notes = []
-    for _, r in out.iterrows():
-        shape = r["Shape"]
-        if shape in ("CIRC", "CIRCULAR", "ROUND"):
-            if pd.isna(r.get("D_mm")):
-                notes.append("Missing D_mm for circular column")
-            else:
-                notes.append("")
-        else:
-            if pd.isna(r.get("b_mm")) or pd.isna(r.get("h_mm")):
-                notes.append("Missing b_mm/h_mm for rectangular column")
-            else:
-                notes.append("")
-    out["Notes"] = notes
+ned_band = st.number_input(
+    "NEd band for column types (kN)",
+    min_value=0.0,
+    value=NED_BAND_KN,
+    step=50.0,
+    help="NEd is rounded up to the band and every distinct section / concrete / cover / banded NEd "
+         "is designed once. 0 (default) designs the exact forces like the batch CLI, identical rows "
+         "are still designed once.",
+)
 
+generate = st.button("Generate column schedule")
+if generate:
+    # After the first generate the schedule follows every edit of the input table
+    st.session_state.schedule_live = True
+
+design_params = (default_bar_diam, tuple(sorted(bar_diams)), optimise, ned_band)
+
+# Same input + design parameters -> same schedule, whatever widget triggered the rerun
+schedule_key = make_key("schedule", input_hash, *design_params)
+
+
+def schedule_job(job: Job, df: pd.DataFrame, snapshot, key: str, chosen_d_mm, diams, optimise, band_kN, params):
+    # Runs on a worker thread for long tables: no st.* in here, the snapshot goes back as part of the result
+    # Only rows added / changed since the last run are recalculated
+    out, snapshot, n_changed = recompute_changed(
+        df,
+        snapshot,
+        # Whole-table calculation, once per column type, in chunks for the progress bar:
+        # Ac_mm2, n_bars, bar_diam_mm, As_provided_mm2, Notes
+        lambda part: in_chunks(
+            part,
+            lambda chunk: compute_schedule_by_type(chunk, chosen_d_mm, bar_diams=diams, optimise=optimise,
+                                                   band_kN=band_kN),
+            job,
+        ),
+        params=params,
+    )
+    # Type labels are numbered over the whole table, not per recalculated part
+    types, type_table = column_type_schedule(out)
+    out = out.assign(Type=types)[["Column_ID", "Type"] + [c for c in out.columns if c != "Column_ID"]]
+    out = apply_schema(out, SCHEDULE_RESULT_SCHEMA)
+    result = cache.put(key, (out, type_table))
+    return result, snapshot, n_changed
+
+
+def collect_schedule(result):
+    (out, type_table), st.session_state.schedule_snapshot, st.session_state.schedule_recomputed = result
+    # Kept in the session too, in case the cache had to drop it
+    st.session_state.schedule_result = (schedule_key, out, type_table)
+
+
+def finished_schedule():
+    """(out, type_table) for the current inputs, if they were calculated already."""
+    kept = st.session_state.get("schedule_result")
+    if kept is not None and kept[0] == schedule_key:
+        return kept[1:]
+    return cache.get(schedule_key)
+
+
+@st.fragment(run_every=POLL_S)
+def schedule_progress():
+    # Polls the running job; only this fragment reruns until the job has finished
+    job = st.session_state.get("schedule_job")
+    if job is None:
+        return
+    if job.running:
+        st.progress(job.fraction, text=job.status_text())
+        if st.button("Cancel", key="cancel_schedule"):
+            job.cancel()
+        return
+    st.rerun(scope="app")
+
+
+job = st.session_state.get("schedule_job")
+if job is not None and job.key != schedule_key:
+    # The inputs changed while running: the old result is no longer wanted
+    job.cancel()
+    del st.session_state.schedule_job
+elif job is not None and not job.running:
+    # A finished background job hands over its result (cancelled: back to the button)
+    del st.session_state.schedule_job
+    try:
+        collect_schedule(job.result())
+    except JobCancelled:
+        st.session_state.schedule_live = False
+        st.info("Column schedule cancelled, press 'Generate column schedule' to start again.")
+    except Exception as e:
+        st.session_state.schedule_live = False
+        st.error(f"Column schedule failed: {e}")
+
+out = None
+if st.session_state.get("schedule_live"):
+    found = finished_schedule()
+    job_args = (input_df, st.session_state.get("schedule_snapshot"), schedule_key, default_bar_diam,
+                tuple(bar_diams), optimise, ned_band, design_params)
+    if found is not None:
+        out, type_table = found
+    elif len(input_df) < BACKGROUND_MIN_ROWS:
+        collect_schedule(run_inline(schedule_key, schedule_job, *job_args))
+        out, type_table = finished_schedule()
+    elif "schedule_job" not in st.session_state:
+        # Long tables: calculated in the background, widgets stay usable, the result survives reruns
+        st.session_state.schedule_job = submit(background_executor(), schedule_key, schedule_job, *job_args,
+                                               label="Column schedule")
+
+if st.session_state.get("schedule_job") is not None:
+    schedule_progress()
+
+if out is not None:
     st.subheader("Generated column schedule")
+    st.caption(f"Recalculated rows: {st.session_state.schedule_recomputed} of {len(out)}")
     st.dataframe(out, use_container_width=True)
 
-    # Export to Excel
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        out.to_excel(writer, index=False, sheet_name="Column_Schedule")
-    buf.seek(0)
+    st.subheader("Column type schedule")
+    st.caption(f"{len(out):,} columns -> {len(type_table):,} types (section, concrete, cover and reinforcement)")
+    st.dataframe(type_table, hide_index=True, use_container_width=True)
+    st.download_button(
+        "Download type schedule as csv",
+        data=lambda: type_table.to_csv(index=False),
+        file_name="column_types.csv",
+        mime="text/csv",
+        on_click="ignore",
+    )
+
+    # Export (xlsx: schedule + summary by bar diameter + validation issues; csv / parquet for Revit preprocessing)
+    export_formats = ["xlsx", "csv"] + (["parquet"] if parquet_available() else [])
+    export_fmt = st.radio("Export format", export_formats, horizontal=True)
+    file_name, mime = FORMATS[export_fmt]
 
     st.download_button(
-        "Download schedule as Excel",
-        data=buf,
-        file_name="column_schedule.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        f"Download schedule as {export_fmt}",
+        # written only when clicked, in row blocks through a spooled temp file (Streamlit keeps the bytes)
+        data=lambda: export_bytes(out, export_fmt),
+        file_name=file_name,
+        mime=mime,
+        on_click="ignore",
     )
 
 # Footer
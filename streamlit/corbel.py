@@ -7,15 +7,51 @@ Run Program with following command:
 streamlit run corbel.py
 
 """
+import io
+import time
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import altair as alt
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app_cache import LRUCache, hash_bytes, hash_frame, make_key
+from background import BACKGROUND_MIN_ROWS, CHUNK_ROWS, POLL_S, JobCancelled, make_executor, run_inline, submit
+from corbel_calc import (
+    SWEEP_MAX_EVALUATIONS,
+    corbel_frame,
+    design_csv,
+    iter_csv_chunks,
+    load_arrays,
+    optimise_corbel,
+    sweep,
+    sweep_evaluations,
+)
+from corbel_core import CONCRETE_GRADE, STEEL_GRADE, TYPE_LABELS, corbel_type, lever_arm, strut_capacity
+from design_types import H_BAND_KN, V_BAND_KN, corbel_frame_by_type, corbel_type_schedule
+from envelope import corbel_envelope, corbel_envelope_chunks, needs_envelope
+from incremental import recompute_changed
+from table_schema import CORBEL_SCHEMA, apply_schema
+
 # Set page title and icon
 st.set_page_config(page_title="Corbel Designer", page_icon=":heart:")
 
+
+@st.cache_resource
+def shared_cache() -> LRUCache:
+    # One cache per server process, shared by all sessions
+    return LRUCache()
+
+
+@st.cache_resource
+def background_executor() -> ThreadPoolExecutor:
+    # Worker threads shared by all sessions, each session keeps its own job handle
+    return make_executor()
+
+
+cache = shared_cache()
+
 # Page title and description
 st.title("Corbel Design App")
 st.markdown("")
@@ -42,92 +78,271 @@ st.markdown("Horizontal force H in kN")
 
 
 if "df" not in st.session_state:
-    placeholder_data = np.array([(150,120,"Corbel 1"),(250,65,"Corbel 2"),(200,120,"Corbel 3"),(300,50,"Corbel 4")])
-    st.session_state.df = pd.DataFrame(placeholder_data, columns=["V",
-                                                                    "H",
-                                                                    "Location"])
+    placeholder_data = {"V": [150, 250, 200, 300], "H": [120, 65, 120, 50],
+                        "Location": ["Corbel 1", "Corbel 2", "Corbel 3", "Corbel 4"]}
+    # Typed once (Float32 loads), not a NumPy array of mixed tuples that turns every column into text
+    st.session_state.df = apply_schema(pd.DataFrame(placeholder_data), CORBEL_SCHEMA, editable=True)
 
 # ncol = st.session_state.df.shape[1]  # col count
 # rw = -1
     
 
-st.session_state.df = st.data_editor(st.session_state.df, use_container_width=True,num_rows="dynamic")
+st.session_state.df = apply_schema(
+    st.data_editor(st.session_state.df, use_container_width=True,num_rows="dynamic"),
+    CORBEL_SCHEMA,
+    editable=True,  # Location stays text, the editor cannot add categories
+)
 
 #st.dataframe(st.session_state.df, use_container_width=True)
 
 st.subheader("Upload RFEM data")
-uploaded_file = st.file_uploader("Choose a file")
+st.markdown("CSV with columns Vertical Force, Horizontal Force, Corbel Name (or V, H, Location), "
+            "optionally Load Combination (or Combination).")
+uploaded_file = st.file_uploader("Choose a file", type=["csv"])
 if uploaded_file is not None:
-
-    # Can be used wherever a "file-like" object is accepted:
-    df = pd.read_csv(uploaded_file)
-    st.write(df)
-
-length = len(st.session_state.df["H"])
+    st.success("Using uploaded loads for the calculation (overrides the table above).")
+
+use_envelope = st.checkbox(
+    "Envelope over load combinations",
+    value=True,
+    help="Rows with the same Location are load combinations of one corbel: only the combination "
+         "with the largest As1 (with its concurrent V/H) is designed.",
+)
+use_types = st.checkbox(
+    "Group into corbel types",
+    value=True,
+    help="V and H are rounded up to the bands, every distinct (V, H) pair is designed once and "
+         "becomes a corbel type (K-Type-01, ...). Bands of 0 (default) keep the exact loads.",
+)
+v_band, h_band = 0.0, 0.0
+if use_types:
+    band_cols = st.columns(2)
+    v_band = band_cols[0].number_input("V band [kN]", min_value=0.0, value=V_BAND_KN, step=5.0)
+    h_band = band_cols[1].number_input("H band [kN]", min_value=0.0, value=H_BAND_KN, step=5.0)
+type_params = (use_types, v_band, h_band)
+
+# Rows shown in the results table, the full table is in the download
+MAX_DISPLAY_ROWS = 10_000
 
 st.markdown("---")
 # Calculation section
 st.subheader("Calculation")
 
-ac = corbel_depth/2
+ac = lever_arm(corbel_depth, pad_offset) #cm, same lever arm as the calculation
 hc = corbel_height
 
-if ac <= 0.2*hc:
-    type = 'Extra Short Corbel'
-elif ac < 0.5*hc:
-    type = 'Short Corbel'
-elif 0.4*hc <= ac <= hc:
-    type = 'Strut and Tie Corbel'
-else:
-    type = 'Error: Calculate as cantilever beam if ac > hc'
+type = TYPE_LABELS[int(corbel_type(ac, hc))]
 
 st.write("Corbel calculation type = ", type)
 
 
-# calculation per Schneider 20. [5.124] eqs 5.11 and 5.24
-# for row in st.session_state.df:
-# V = st.session_state.df["V"]
-h = pd.to_numeric(st.session_state.df["V"]) #typecast to float from string or whatever streamlit has as input
-# H = st.session_state.df["H"]
-v = pd.to_numeric(st.session_state.df["H"])
-
-st.write("Concrete Grade = C50/60")
-st.write("Steel Grade = B500B")
-fck = 50 #50Mpa = 5kN/cm2 for C50/60 concrete
-fy = 500 # for B500B steel grade
-fyd = 500/1.15 
-vrd = (0.5*(0.7-fck/200)*(column_width*10/2)*(corbel_height*10)*fck/1.50)/1000 #calc conc. strut with V_Rdmax = 0,5*(0,7-fck/200)*b*z*fck/gammaC (in KN)
-#st.write("vrd ", Vrd)
-
-cover = 5 #5cm concrete cover
-d = corbel_height - cover
-ac = corbel_depth - pad_offset #cm
-z0 = d*(1-0.4*(v.divide(vrd))) # use .divde() method on pd dataframes
-#st.write("z0 ", z0)
-
-zed = v*(ac/z0) + h*((cover+z0)/z0) #units in cm
-#st.write("zed ", Zed)
-
-as1 = (zed/fyd)*100 # in cm2
-as2 = as1*0.5 #in cm2
+# calculation per Schneider 20. [5.124] eqs 5.11 and 5.24, shared with the VIKTOR app (corbel_core)
+st.write(f"Concrete Grade = {CONCRETE_GRADE}")
+st.write(f"Steel Grade = {STEEL_GRADE}")
+
+vrd = strut_capacity(column_width, corbel_height) #calc conc. strut with V_Rdmax = 0,5*(0,7-fck/200)*b*z*fck/gammaC (in KN)
+
+
+corbel_params = (column_width, pad_offset, corbel_height, corbel_depth)
+
+
+def design_loads(loads: pd.DataFrame) -> pd.DataFrame:
+    # Each distinct banded (V, H) is designed once when grouping into types
+    if use_types:
+        return corbel_frame_by_type(loads, column_width, corbel_height, corbel_depth, pad_offset, v_band, h_band)
+    return corbel_frame(loads, column_width, corbel_height, corbel_depth, pad_offset)
+
+
+def csv_envelope_job(job, data: bytes, geometry: tuple):
+    # Worker thread, no st.* in here. Default (large) chunks: each chunk is merged with the running envelope
+    job.total = max(data.count(b"\n") - 1, 0)
+    return corbel_envelope_chunks(job.track(iter_csv_chunks(io.BytesIO(data))), *geometry)
+
+
+def csv_design_job(job, data: bytes, geometry: tuple, type_params: tuple):
+    # Typed designs are banded inside the same chunked pass, not designed again afterwards
+    job.total = max(data.count(b"\n") - 1, 0)
+    typed, v, h = type_params
+    frame = partial(corbel_frame_by_type, v_band=v, h_band=h) if typed else None
+    return design_csv(io.BytesIO(data), *geometry, chunksize=CHUNK_ROWS, progress=job.advance, frame=frame)
+
+
+@st.fragment(run_every=POLL_S)
+def corbel_progress():
+    # Polls the running job; only this fragment reruns until the job has finished
+    job = st.session_state.get("corbel_job")
+    if job is None:
+        return
+    if job.running:
+        st.progress(job.fraction, text=job.status_text())
+        if st.button("Cancel", key="cancel_corbel"):
+            job.cancel()
+        return
+    st.rerun(scope="app")
+
+
+def job_result(key: str, n_rows: int, fn, *args, label: str = ""):
+    """
+    Cached result of fn(job, *args) for key. Small inputs are calculated
+    inline; long ones in a background job that survives reruns, the rest
+    of the page waits (st.stop) until it has finished.
+    """
+    kept = st.session_state.get("corbel_result")
+    if kept is not None and kept[0] == key:
+        return kept[1]
+    found = cache.get(key)
+    if found is not None:
+        return found
+    if n_rows < BACKGROUND_MIN_ROWS:
+        return cache.put(key, run_inline(key, fn, *args, label=label))
+
+    if st.session_state.get("corbel_cancelled") == key:
+        st.info(f"{label} cancelled.")
+        if not st.button("Start again"):
+            st.stop()
+        del st.session_state.corbel_cancelled
+
+    job = st.session_state.get("corbel_job")
+    if job is not None and job.key == key and not job.running:
+        del st.session_state.corbel_job
+        try:
+            result = job.result()
+        except JobCancelled:
+            st.session_state.corbel_cancelled = key
+            st.rerun()
+        # Kept in the session too, in case the cache had to drop it
+        st.session_state.corbel_result = (key, result)
+        return cache.put(key, result)
+    if job is None or job.key != key:
+        if job is not None:
+            # Other file / geometry: the old result is no longer wanted
+            job.cancel()
+        st.session_state.corbel_job = submit(background_executor(), key, fn, *args, label=label)
+    corbel_progress()
+    st.stop()
+
+
+def run_corbel() -> pd.DataFrame:
+    # Only rows whose V/H changed since the last run are recalculated
+    res, st.session_state.corbel_snapshot, n_changed = recompute_changed(
+        st.session_state.df,
+        st.session_state.get("corbel_snapshot"),
+        lambda part: design_loads(part),
+        columns=["V", "H"],
+        params=corbel_params + type_params,
+    )
+    st.session_state.corbel_recomputed = n_changed
+    return res
+
+
+st.session_state.corbel_recomputed = 0
+governing_location = None
+n_load_rows = None
+opt_loads = None
+designed_by_type = False
+geometry = (column_width, corbel_height, corbel_depth, pad_offset)
+if uploaded_file is not None:
+    data = uploaded_file.getvalue()
+    n_rows = data.count(b"\n")
+
+if uploaded_file is not None and use_envelope:
+    # Streamed chunk by chunk, only the running envelope (one row per Location) is kept
+    envelope_key = make_key("csv_envelope", hash_bytes(data), *corbel_params)
+    try:
+        res = job_result(envelope_key, n_rows, csv_envelope_job, data, geometry, label="Corbel envelope")
+    except ValueError as e:
+        st.error(f"Could not read uploaded file: {e}")
+        st.stop()
+    loads = res[["Location", "Combination", "V", "H", "n_combinations"]]
+    source_key = envelope_key
+    n_load_rows = int(res["n_combinations"].sum())
+    st.session_state.corbel_recomputed = len(res)
+elif uploaded_file is not None:
+    # Uploaded CSV is streamed through the calculation chunk by chunk, cached by file content + geometry
+    upload_key = make_key("csv", hash_bytes(data), *corbel_params, *type_params)
+    try:
+        design = job_result(upload_key, n_rows, csv_design_job, data, geometry, type_params, label="Corbel design")
+    except ValueError as e:
+        st.error(f"Could not read uploaded file: {e}")
+        st.stop()
+    loads = design.table[["V", "H", "Location"]]
+    source_key = upload_key
+    res = design.table
+    governing_location = design.governing_location
+    designed_by_type = use_types
+    st.session_state.corbel_recomputed = len(res)
+elif use_envelope and needs_envelope(st.session_state.df, "Location"):
+    # Repeated Locations in the table: governing combination per corbel
+    envelope_key = make_key("corbel_envelope", hash_frame(st.session_state.df), *corbel_params)
+    res = cache.get_or_compute(
+        envelope_key,
+        lambda: corbel_envelope(st.session_state.df, column_width, corbel_height, corbel_depth, pad_offset),
+    )
+    loads = res[["Location", "Combination", "V", "H", "n_combinations"]]
+    source_key = envelope_key
+    n_load_rows = len(st.session_state.df)
+    opt_loads = st.session_state.df
+    st.session_state.corbel_recomputed = len(res)
+else:
+    # Cached by table content + sidebar geometry, unrelated reruns skip the calculation
+    corbel_key = make_key("corbel", hash_frame(st.session_state.df), *corbel_params, *type_params)
+    loads = st.session_state.df
+    source_key = None
+    res = cache.get_or_compute(corbel_key, run_corbel)
+
+if use_types:
+    if source_key is not None and not designed_by_type:
+        # Envelope rows: banded and designed once per type after the reduction
+        res = cache.get_or_compute(make_key("corbel_typed", source_key, *type_params), lambda: design_loads(loads))
+        governing_location = None
+    types_key = make_key("corbel_type_schedule", source_key or corbel_key, *type_params)
+    corbel_types, type_table = cache.get_or_compute(types_key, lambda: corbel_type_schedule(loads, res))
+
+z0, zed, as1, as2 = res["z0"], res["Zed"], res["As1"], res["As2"]
+length = len(loads)
+if n_load_rows is not None:
+    st.info(f"Envelope: {n_load_rows:,} load rows -> {length:,} corbels, designed for the governing combination.")
 
 # Results
 st.write("Run Rebar Calculation")
 
 run = st.button('Submit')
-
 if run:
+    # After the first submit the results follow every edit of the table
+    st.session_state.corbel_live = True
+
+if st.session_state.get("corbel_live"):
 
     column_tag = np.full((length), str(column_width) + " x " + str(column_width))
     df_results = pd.DataFrame({'Column Size':column_tag,
                                'As Anchorage [cm2]': as1.round(2),
-                               'As Stirrups [cm2]': as2.round(2)})
-
-    st.write(pd.concat([st.session_state.df,df_results],axis=1))
-
-    st.write(f"Calculated Locations: {st.session_state.df.shape[0]}")
-    maximum = df_results['As Anchorage [cm2]'].idxmax()
-    st.write(f"Max As Anchorage Location: {st.session_state.df['Location'].iloc[maximum]}")
+                               'As Stirrups [cm2]': as2.round(2)}, index=res.index)
+    if use_types:
+        df_results.insert(0, 'Type', corbel_types)
+
+    table = pd.concat([loads,df_results],axis=1)
+    st.write(table.head(MAX_DISPLAY_ROWS))
+    if length > MAX_DISPLAY_ROWS:
+        st.caption(f"Showing the first {MAX_DISPLAY_ROWS:,} of {length:,} rows.")
+        st.download_button("Download results (.csv)", data=lambda: table.to_csv(index=False),
+                           file_name="corbel_results.csv", mime="text/csv", on_click="ignore")
+
+    st.write(f"Calculated Locations: {length}")
+    n_invalid = int((z0 <= 0).sum())
+    if n_invalid:
+        st.warning(f"{n_invalid} location(s) with z0 <= 0 (V >= Vrd/0.4): increase corbel height or column size.")
+    st.caption(f"Recalculated rows: {st.session_state.corbel_recomputed} of {length}")
+    if governing_location is None:
+        maximum = df_results['As Anchorage [cm2]'].idxmax()
+        governing_location = loads['Location'].loc[maximum]
+    st.write(f"Max As Anchorage Location: {governing_location}")
+
+    if use_types:
+        st.markdown("#### Corbel Type Schedule")
+        st.caption(f"{length:,} corbels -> {len(type_table):,} types, each designed once for its banded V / H.")
+        st.dataframe(type_table, hide_index=True, use_container_width=True)
+        st.download_button("Download type schedule (.csv)", data=lambda: type_table.to_csv(index=False),
+                           file_name="corbel_types.csv", mime="text/csv", on_click="ignore")
 
 st.markdown("---")
 st.subheader("Show Calculation Steps")
@@ -136,7 +351,7 @@ run_steps = st.button('Show Steps')
 if run_steps:
     st.write("Calculation Steps")
     results_map = [
-        {"label": "Concrete Strut Capacity ($V_{Rd,max}$)", "code": "Vrd = (0.5*(0.7-fck/200)*(b*10/2)*(h*10)*fck/1.50)/1000", "value": round(vrd,2)},
+        {"label": "Concrete Strut Capacity ($V_{Rd,max}$)", "code": "Vrd = (0.5*(0.7-fck/200)*(b*10/2)*(h*10)*fck/1.50)/1000", "value": round(float(vrd),2)},
         {"label": "Internal Lever Arm ($z_0$)", "code": "z0 = d*(1-0.4*(V/Vrd))", "value": z0},
         {"label": "Tensile Force ($Z_{ed}$)", "code": "Zed = V*(ac/z0) + H*((cover+z0)/z0)", "value": zed},
         {"label": "Primary Rebar ($As_1$)", "code": "As1 = (Zed/fyd)*100", "value": as1},
@@ -152,6 +367,111 @@ if run_steps:
             st.divider()
 
 
+st.markdown("---")
+st.subheader("Design-space Sweep")
+st.markdown("Every corbel height (40-120 cm) x depth (30-200 cm) x column size for all V/H rows in use "
+            "(table or upload), calculated in blocks of load rows.")
+
+width_options = sorted({40, 50, 60, 70, 80, 90, 100, 120, int(column_width)})
+sweep_widths = st.multiselect("Column sizes [cm]", options=width_options, default=[int(column_width)])
+
+run_sweep = st.button('Run Sweep')
+if run_sweep and sweep_widths:
+    st.session_state.sweep_widths = tuple(sorted(sweep_widths))
+
+sweep_ready = False
+if st.session_state.get("sweep_widths"):
+    # Same loads as the optimiser: every combination of the table, the envelope / design rows of an upload
+    sweep_loads = opt_loads if opt_loads is not None else loads
+    V, H = load_arrays(sweep_loads)
+    ok = ~(np.isnan(V) | np.isnan(H))
+    n_evaluations = sweep_evaluations(int(ok.sum()), widths=st.session_state.sweep_widths)
+    if n_evaluations > SWEEP_MAX_EVALUATIONS:
+        st.warning(f"The sweep would take {n_evaluations:,} evaluations (limit {SWEEP_MAX_EVALUATIONS:,}): "
+                   f"select fewer column sizes or use the envelope over load combinations.")
+    else:
+        sweep_ready = True
+
+if sweep_ready:
+    t0 = time.perf_counter()
+    sweep_key = make_key("sweep", source_key or corbel_key, st.session_state.sweep_widths, pad_offset)
+    cube = cache.get_or_compute(
+        sweep_key,
+        lambda: sweep(V[ok], H[ok], widths=st.session_state.sweep_widths, pad_offset=pad_offset),
+    )
+    st.write(f"{cube.n_evaluations:,} evaluations in {(time.perf_counter() - t0)*1000:.0f} ms")
+
+    width_sel = st.selectbox("Heatmap column size [cm]", cube.widths, format_func=lambda w: f"{w:g}")
+    k = int(np.flatnonzero(cube.widths == width_sel)[0])
+
+    import matplotlib.pyplot as plt  # only needed once a sweep is shown
+
+    fig, ax = plt.subplots(figsize=(9, 5))
+    extent = [cube.depths[0], cube.depths[-1], cube.heights[0], cube.heights[-1]]
+    im = ax.imshow(cube.As1_max[:, :, k], origin="lower", aspect="auto", extent=extent, cmap="viridis")
+    # calculation type boundaries (extra short / short / strut and tie / cantilever)
+    ax.contour(cube.depths, cube.heights, cube.type, levels=[0.5, 1.5, 2.5], colors="white", linewidths=0.8)
+    ax.plot(corbel_depth, corbel_height, "r+", markersize=12, label="Current sliders")
+    ax.set_xlabel("Corbel depth [cm]")
+    ax.set_ylabel("Corbel height [cm]")
+    ax.set_title(f"Governing As1 [cm2], column {width_sel:g} x {width_sel:g} cm (blank: z0 <= 0)")
+    ax.legend(loc="upper right")
+    fig.colorbar(im, ax=ax, label="As1 [cm2]")
+    st.pyplot(fig)
+    plt.close(fig)
+
+    type_counts = pd.Series(cube.type.ravel()).value_counts().sort_index()
+    st.write(pd.DataFrame({"Calculation type": [TYPE_LABELS[i] for i in type_counts.index],
+                           "Height/depth points": type_counts.to_numpy()}))
+
+    def cube_npz() -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **cube._asdict())
+        return buf.getvalue()
+
+    st.download_button("Download results cube (.npz)", data=cube_npz, file_name="corbel_sweep.npz", on_click="ignore")
+
+
+st.markdown("---")
+st.subheader("Minimum Corbel Size")
+st.markdown(
+    "Smallest corbel height (40-120 cm) at the given depth that passes ac/hc <= 0.5, "
+    "z0 > 0 (V < Vrd/0.4) and the As1 cap for every V/H row. "
+    "A deeper corbel never helps these checks, so the depth is the minimum required for the bearing."
+)
+opt_depth = st.number_input("Minimum corbel depth (bearing) [cm]", min_value=10, max_value=200, value=int(corbel_depth))
+as1_cap = st.number_input("Max As1 [cm2]", min_value=1.0, value=50.0)
+height_step = st.selectbox("Height step [cm]", [1, 5, 10], index=1)
+
+run_opt = st.button('Optimise')
+if run_opt:
+    # every combination of the table; an enveloped upload only keeps the governing one per corbel
+    if opt_loads is None:
+        opt_loads = loads
+    V, H = load_arrays(opt_loads)
+    try:
+        opt = optimise_corbel(V, H, opt_depth, column_width, pad_offset, as1_cap, step=height_step)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+
+    st.write(pd.DataFrame({"Location": opt_loads["Location"].to_numpy(),
+                           "V": V, "H": H, "Min. height [cm]": opt.heights}).head(MAX_DISPLAY_ROWS))
+    if opt.n_missing:
+        st.warning(f"{opt.n_missing:,} row(s) without V or H are left out of the optimisation.")
+    if opt.governing < 0:
+        st.info("No load rows to optimise.")
+    else:
+        gov_location = opt_loads["Location"].iloc[opt.governing]
+        if np.isnan(opt.height):
+            st.error(f"No height up to 120 cm works for {gov_location}: increase the column size, "
+                     f"the As1 cap or reduce the load.")
+        else:
+            st.success(f"Minimum corbel: height {opt.height:g} cm x depth {opt_depth} cm "
+                       f"(column {column_width} x {column_width} cm)")
+            st.write(f"Governing load case: {gov_location}")
+
+
 # Footer
 st.markdown("---")
 st.markdown("W. Binder, 2026")
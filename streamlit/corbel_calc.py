@@ -0,0 +1,263 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Table layer of the corbel calculation for the Streamlit tools.
+
+The formulas themselves live in viktor/corbel_core.py (imported through
+the corbel_core shim next to this file); this module maps V/H tables onto
+them.
+
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from corbel_core import CSV_HEADER_MAP, calc_corbel, check_ratio, corbel_type, lever_arm
+from table_schema import CORBEL_SCHEMA, apply_schema
+
+RESULT_COLUMNS = ["z0", "Zed", "As1", "As2"]
+
+
+def load_arrays(df: pd.DataFrame):
+    """V and H columns as float arrays (text from the editor -> numbers, empty -> NaN)."""
+    V = pd.to_numeric(df["V"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    H = pd.to_numeric(df["H"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return V, H
+
+
+def corbel_frame(df: pd.DataFrame, column_width, corbel_height, corbel_depth, pad_offset) -> pd.DataFrame:
+    """Per-row z0, Zed, As1, As2 for a V/H table and one corbel geometry."""
+    V, H = load_arrays(df)
+    res = calc_corbel(V, H, column_width, corbel_height, corbel_depth, pad_offset)
+    return pd.DataFrame({c: getattr(res, c) for c in RESULT_COLUMNS}, index=df.index)
+
+
+# Slider ranges of corbel.py [cm]
+SWEEP_HEIGHTS = np.arange(40, 121)
+SWEEP_DEPTHS = np.arange(30, 201)
+
+
+# Evaluations per block of load rows: every float64 intermediate of the kernel stays ~8 MB
+SWEEP_BLOCK_EVALUATIONS = 1_000_000
+# Larger sweeps are refused by the app (time, not memory: the blocks keep memory flat)
+SWEEP_MAX_EVALUATIONS = 100_000_000
+
+
+class SweepResult(NamedTuple):
+    heights: np.ndarray    # (nh,)
+    depths: np.ndarray     # (nd,)
+    widths: np.ndarray     # (nw,)
+    n_loads: int           # load rows swept
+    As1_max: np.ndarray    # (nh, nd, nw) governing As1 over all loads, NaN if any load fails
+    governing: np.ndarray  # (nh, nd, nw) index of the governing (or first failing) load row
+    type: np.ndarray       # (nh, nd) corbel_type code, independent of loads and widths
+
+    @property
+    def n_evaluations(self) -> int:
+        return self.n_loads * self.As1_max.size
+
+
+def sweep_evaluations(n_loads: int, heights=SWEEP_HEIGHTS, depths=SWEEP_DEPTHS, widths=(80,)) -> int:
+    return n_loads * len(heights) * len(depths) * len(widths)
+
+
+def sweep(V, H, heights=SWEEP_HEIGHTS, depths=SWEEP_DEPTHS, widths=(80,), pad_offset=5,
+          block_evaluations: int = SWEEP_BLOCK_EVALUATIONS) -> SweepResult:
+    """
+    Every load row x corbel height x corbel depth x column width, one
+    broadcast call of the kernel per block of load rows. Only the running
+    governing As1 (and its row) per grid point is kept, so memory depends
+    on the grid and the block size, not on the number of loads.
+    """
+    V = np.asarray(V, dtype=float)
+    H = np.asarray(H, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    depths = np.asarray(depths, dtype=float)
+    widths = np.asarray(widths, dtype=float)
+
+    grid_shape = (len(heights), len(depths), len(widths))
+    block = max(1, block_evaluations // int(np.prod(grid_shape)))
+    # failing loads score +inf, so the first failing row governs (strict > keeps the first maximum)
+    score_max = np.full(grid_shape, -np.inf)
+    governing = np.zeros(grid_shape, dtype=np.int64)
+    for start in range(0, len(V), block):
+        res = calc_corbel(
+            V[start:start + block, None, None, None],
+            H[start:start + block, None, None, None],
+            widths[None, None, None, :],
+            heights[None, :, None, None],
+            depths[None, None, :, None],
+            pad_offset,
+        )
+        score = np.where(res.valid, res.As1, np.inf)
+        arg = score.argmax(axis=0)
+        best = np.take_along_axis(score, arg[None], axis=0)[0]
+        better = best > score_max
+        score_max = np.where(better, best, score_max)
+        governing = np.where(better, arg + start, governing)
+
+    As1_max = np.where(np.isfinite(score_max), score_max, np.nan)
+    ac = lever_arm(depths[None, :], pad_offset)
+    ctype = corbel_type(ac, heights[:, None]).astype(np.int8)
+    return SweepResult(heights, depths, widths, len(V), As1_max.astype(np.float32), governing, ctype)
+
+
+class OptimiseResult(NamedTuple):
+    heights: np.ndarray  # minimum height per load row [cm], NaN if nothing in range works
+    height: float        # minimum height for the whole family (all rows) [cm], NaN if infeasible
+    governing: int       # index of the load row that sets the family height, -1 without load rows
+    n_missing: int = 0   # rows without V or H, left out of the family height
+
+
+def corbel_ok(V, H, column_width, corbel_height, corbel_depth, pad_offset, as1_max):
+    """Design checks: ac/hc <= 0.5, z0 > 0 (V < Vrd/0.4) and As1 <= as1_max."""
+    res = calc_corbel(V, H, column_width, corbel_height, corbel_depth, pad_offset)
+    with np.errstate(invalid="ignore"):
+        return check_ratio(res.ac, corbel_height) & res.valid & (res.As1 <= as1_max)
+
+
+def min_corbel_height(V, H, corbel_depth, column_width, pad_offset, as1_max,
+                      h_min=SWEEP_HEIGHTS[0], h_max=SWEEP_HEIGHTS[-1], step=1) -> np.ndarray:
+    """
+    Smallest height on the grid h_min, h_min+step, ... h_max that passes
+    corbel_ok, per load row. For H >= 0 all checks only get easier with a
+    deeper section (z0 grows with the height), so a bisection over the grid
+    index (all rows at once, one kernel call per step) replaces trying
+    every height. A negative H breaks that (its share of As1 grows with z0)
+    and raises ValueError. Rows that pass at h_min need no bisection, rows
+    that fail at h_max (or have no V / H) get NaN.
+    """
+    V = np.asarray(V, dtype=float)
+    H = np.asarray(H, dtype=float)
+    negative = np.flatnonzero(H < 0)
+    if negative.size:
+        raise ValueError(f"H must be >= 0 for the height optimisation, row {negative[0] + 1} has H = "
+                         f"{H[negative[0]]:g} kN ({negative.size} row(s) with negative H)")
+    grid = np.arange(h_min, h_max + step / 2, step, dtype=float)
+    if grid.size == 0:
+        return np.full(V.shape, np.nan)
+
+    def ok(idx):
+        return corbel_ok(V, H, column_width, grid[idx], corbel_depth, pad_offset, as1_max)
+
+    # both ends of the bracket first
+    # invariant: grid[lo] fails (lo = -1 means "below the grid"), grid[hi] passes
+    lo = np.full(V.shape, -1)
+    hi = np.full(V.shape, len(grid) - 1)
+    bottom = ok(np.zeros(V.shape, dtype=int))
+    feasible = ok(hi) | bottom
+    hi = np.where(bottom, 0, hi)
+    while np.any(feasible & (hi - lo > 1)):
+        mid = (lo + hi) // 2
+        # rows already converged keep their bracket, np.maximum keeps mid a valid index
+        passes = ok(np.maximum(mid, 0))
+        active = feasible & (hi - lo > 1)
+        hi = np.where(active & passes, mid, hi)
+        lo = np.where(active & ~passes, mid, lo)
+
+    return np.where(feasible, grid[hi], np.nan)
+
+
+def optimise_corbel(V, H, corbel_depth, column_width, pad_offset, as1_max, **grid) -> OptimiseResult:
+    """
+    Minimum corbel height per load row and for the whole family, with the
+    governing row. Rows without V or H are counted in n_missing and left out
+    of the family height.
+    """
+    heights = min_corbel_height(V, H, corbel_depth, column_width, pad_offset, as1_max, **grid)
+    loaded = ~(np.isnan(np.asarray(V, dtype=float)) | np.isnan(np.asarray(H, dtype=float)))
+    n_missing = int((~loaded).sum())
+    if not loaded.any():
+        return OptimiseResult(heights, np.nan, -1, n_missing)
+    # an infeasible row governs (NaN sorts as the worst case), rows without loads never do
+    score = np.where(np.isnan(heights), np.inf, heights)
+    governing = int(np.argmax(np.where(loaded, score, -np.inf)))
+    return OptimiseResult(heights, float(heights[governing]), governing, n_missing)
+
+
+# read straight into the table schema: Float32 loads, categorical names
+CSV_DTYPES = {c: CORBEL_SCHEMA[c] for c in ("V", "H", "Location")}
+# long format, one row per corbel and load combination (see envelope.py)
+CSV_OPTIONAL_DTYPES = {"Combination": CORBEL_SCHEMA["Combination"]}
+CSV_OPTIONAL_HEADERS = {"Load Combination": "Combination"}
+CSV_CHUNKSIZE = 100_000
+
+
+class CsvDesign(NamedTuple):
+    table: pd.DataFrame     # Location, V, H, z0, Zed, As1, As2 per row
+    governing_location: str
+    governing_as1: float
+    n_invalid: int          # rows with z0 <= 0
+
+
+def _csv_columns(file) -> dict:
+    """Raw header -> V/H/Location, from the header line only."""
+    header = pd.read_csv(file, nrows=0, encoding="utf-8-sig").columns
+    if hasattr(file, "seek"):
+        file.seek(0)
+    mapping = {}
+    for raw in header:
+        name = CSV_HEADER_MAP.get(raw.strip()) or CSV_OPTIONAL_HEADERS.get(raw.strip(), raw.strip())
+        if name in CSV_DTYPES or name in CSV_OPTIONAL_DTYPES:
+            mapping[raw] = name
+    missing = set(CSV_DTYPES) - set(mapping.values())
+    if missing:
+        raise ValueError(f"Missing column(s) {sorted(missing)} in uploaded file, expected "
+                         f"{list(CSV_HEADER_MAP)} or {list(CSV_DTYPES)}.")
+    return mapping
+
+
+def iter_csv_chunks(file, chunksize: int = CSV_CHUNKSIZE):
+    """V/H/Location (+ Combination) frames of at most chunksize rows, read with explicit dtypes."""
+    mapping = _csv_columns(file)
+    dtypes = {**CSV_DTYPES, **CSV_OPTIONAL_DTYPES}
+    columns = [c for c in dtypes if c in mapping.values()]
+    reader = pd.read_csv(
+        file,
+        usecols=list(mapping),
+        dtype={raw: dtypes[name] for raw, name in mapping.items()},
+        chunksize=chunksize,
+        encoding="utf-8-sig",
+    )
+    for chunk in reader:
+        yield chunk.rename(columns=mapping)[columns]
+
+
+def iter_corbel_chunks(chunks, column_width, corbel_height, corbel_depth, pad_offset, frame=None):
+    """
+    Load chunks -> load columns + corbel results, one chunk at a time.
+    frame: corbel_frame or a drop-in with the same arguments (e.g. design_types.corbel_frame_by_type).
+    """
+    frame = frame or corbel_frame
+    for chunk in chunks:
+        res = frame(chunk, column_width, corbel_height, corbel_depth, pad_offset)
+        yield pd.concat([chunk[["Location", "V", "H"]], res], axis=1)
+
+
+def design_csv(file, column_width, corbel_height, corbel_depth, pad_offset, chunksize: int = CSV_CHUNKSIZE,
+               progress=None, frame=None) -> CsvDesign:
+    """
+    Stream an RFEM load CSV through the corbel calculation, tracking the governing row per chunk.
+    progress(rows) is called after each chunk (e.g. background.Job.advance, which raises to stop),
+    frame replaces corbel_frame per chunk (see iter_corbel_chunks).
+    """
+    parts = []
+    gov_as1, gov_location, n_invalid = -np.inf, "", 0
+    chunks = iter_csv_chunks(file, chunksize)
+    for part in iter_corbel_chunks(chunks, column_width, corbel_height, corbel_depth, pad_offset, frame):
+        as1 = part["As1"].to_numpy()
+        n_invalid += int((part["z0"].to_numpy() <= 0).sum())
+        if np.isfinite(as1).any():
+            i = int(np.nanargmax(np.where(np.isfinite(as1), as1, np.nan)))
+            if as1[i] > gov_as1:
+                gov_as1, gov_location = float(as1[i]), part["Location"].iloc[i]
+        parts.append(part)
+        if progress is not None:
+            progress(len(part))
+
+    table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["Location", "V", "H"] + RESULT_COLUMNS)
+    # each chunk has its own Location categories, unified once here
+    table = apply_schema(table, CORBEL_SCHEMA)
+    return CsvDesign(table, gov_location, float(gov_as1) if np.isfinite(gov_as1) else np.nan, n_invalid)
@@ -0,0 +1,24 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Import shim for the shared corbel kernel.
+
+The formulas live in viktor/corbel_core.py: that folder is what gets
+deployed to VIKTOR, so the shared kernel has to sit there. This module
+loads that file under the name corbel_core, so the Streamlit modules
+import it as `from corbel_core import ...` like the VIKTOR app does,
+without putting the viktor folder on sys.path.
+
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+SOURCE = Path(__file__).resolve().parent.parent / "viktor" / "corbel_core.py"
+
+_spec = importlib.util.spec_from_file_location(__name__, SOURCE)
+_module = importlib.util.module_from_spec(_spec)
+# the import statement hands out sys.modules[__name__], i.e. the kernel itself
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
@@ -0,0 +1,159 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Typing of repeated columns and corbels.
+
+Rows with the same design-relevant inputs get the same design, so every
+distinct input row (hashed like the incremental recompute) is designed
+once and the result is broadcast back to all rows of that type. Loads are
+banded first: a load is rounded up (in magnitude) to the next multiple of
+the band, so a type is designed for the largest load it can stand for.
+Band 0 (the default) keeps the exact loads and only merges identical
+rows, so the designs match compute_schedule / corbel_frame.
+
+For the drawings, columns with the same section, concrete, cover and
+reinforcement form one type (C-Type-01, ...) of the type schedule.
+
+"""
+import numpy as np
+import pandas as pd
+
+from column_engine import compute_schedule
+from corbel_calc import corbel_frame, load_arrays
+from incremental import row_hashes
+from table_schema import SHAPE_DTYPE, as_dtype
+
+COLUMN_KEY = ["Shape", "b_mm", "h_mm", "D_mm", "fck_MPa", "cover_mm", "NEd_kN"]
+COLUMN_DRAWING_KEY = ["Shape", "b_mm", "h_mm", "D_mm", "fck_MPa", "cover_mm", "n_bars", "bar_diam_mm"]
+
+# exact loads by default like the batch CLI, banding is opted into in the apps
+NED_BAND_KN = 0.0
+V_BAND_KN = 0.0
+H_BAND_KN = 0.0
+
+COLUMN_TYPE_PREFIX = "C-Type-"
+CORBEL_TYPE_PREFIX = "K-Type-"
+
+
+def band_up(values, band: float) -> np.ndarray:
+    """Round away from zero to the next multiple of band (band <= 0: unchanged, NaN stays NaN)."""
+    values = np.asarray(values, dtype=float)
+    if not band or band <= 0:
+        return values
+    return np.sign(values) * np.ceil(np.abs(values) / band) * band
+
+
+def type_codes(key: pd.DataFrame) -> tuple:
+    """(type code per row, first row of each type), types numbered in order of first appearance."""
+    codes, uniques = pd.factorize(row_hashes(key))
+    first = np.full(len(uniques), len(key), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(key)))
+    return codes, first
+
+
+def type_labels(n: int, prefix: str) -> np.ndarray:
+    width = max(2, len(str(n)))
+    return np.array([f"{prefix}{i + 1:0{width}d}" for i in range(n)], dtype=object)
+
+
+def column_design_key(df: pd.DataFrame, band_kN: float = NED_BAND_KN) -> pd.DataFrame:
+    """Design-relevant schedule inputs as numbers, NEd_kN banded."""
+    key = pd.DataFrame({"Shape": as_dtype(df["Shape"], SHAPE_DTYPE)}, index=df.index)
+    for c in COLUMN_KEY[1:]:
+        key[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+    key["NEd_kN"] = band_up(key["NEd_kN"], band_kN)
+    return key
+
+
+def compute_schedule_by_type(df: pd.DataFrame, chosen_d_mm: float, bar_diams=None, optimise: bool = False,
+                             band_kN: float = NED_BAND_KN) -> pd.DataFrame:
+    """
+    compute_schedule with every distinct (section, fck, cover, banded NEd)
+    designed once. Same columns as compute_schedule, plus NEd_design_kN
+    (the banded design force) when a band is used.
+    """
+    key = column_design_key(df, band_kN)
+    codes, first = type_codes(key)
+    designed = compute_schedule(key.iloc[first].reset_index(drop=True), chosen_d_mm,
+                                bar_diams=bar_diams, optimise=optimise)
+
+    out = df.copy()
+    if band_kN and band_kN > 0:
+        out["NEd_design_kN"] = key["NEd_kN"]
+    for c in designed.columns:
+        if c not in key.columns:
+            out[c] = designed[c].to_numpy()[codes]
+    return out
+
+
+def sorted_types(key: pd.DataFrame) -> tuple:
+    """(type index per row, one row per type), types sorted by the key columns."""
+    codes, first = type_codes(key)
+    types = key.iloc[first].reset_index(drop=True)
+    order = types.sort_values(list(key.columns), kind="stable").index.to_numpy()
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank[codes], types.iloc[order].reset_index(drop=True)
+
+
+def _members(ids: pd.Series, codes: np.ndarray) -> list:
+    """Comma-joined ids per type, in table order."""
+    order = np.argsort(codes, kind="stable")
+    ids = ids.astype(str).to_numpy(dtype=object)[order]
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    return [", ".join(part) for part in np.split(ids, bounds)]
+
+
+def column_type_schedule(out: pd.DataFrame, prefix: str = COLUMN_TYPE_PREFIX) -> tuple:
+    """
+    (type label per row, type schedule) of a computed schedule: one type per
+    section, concrete, cover and reinforcement, sorted by shape and size,
+    with the number of columns, the largest design force and the column ids.
+    """
+    key = pd.DataFrame({c: out[c] for c in COLUMN_DRAWING_KEY}, index=out.index)
+    codes, types = sorted_types(key)
+    labels = type_labels(len(types), prefix)
+
+    force = out["NEd_design_kN"] if "NEd_design_kN" in out.columns else out["NEd_kN"]
+    force = pd.to_numeric(force, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    ned_max = np.full(len(types), np.nan)
+    np.fmax.at(ned_max, codes, force)
+
+    types.insert(0, "Type", labels)
+    types["n_columns"] = np.bincount(codes, minlength=len(types))
+    types["NEd_max_kN"] = ned_max
+    types["Column_IDs"] = _members(out["Column_ID"], codes)
+    return labels[codes], types
+
+
+def corbel_frame_by_type(df: pd.DataFrame, column_width, corbel_height, corbel_depth, pad_offset,
+                         v_band: float = V_BAND_KN, h_band: float = H_BAND_KN) -> pd.DataFrame:
+    """
+    corbel_frame with each distinct banded (V, H) designed once (the corbel
+    geometry is the same for the whole table): V_design, H_design, z0, Zed,
+    As1, As2 indexed like df.
+    """
+    V, H = load_arrays(df)
+    key = pd.DataFrame({"V": band_up(V, v_band), "H": band_up(H, h_band)}, index=df.index)
+    codes, first = type_codes(key)
+    designed = corbel_frame(key.iloc[first].reset_index(drop=True), column_width, corbel_height, corbel_depth, pad_offset)
+    out = designed.iloc[codes].set_axis(df.index)
+    out.insert(0, "V_design", key["V"])
+    out.insert(1, "H_design", key["H"])
+    return out
+
+
+def corbel_type_schedule(loads: pd.DataFrame, res: pd.DataFrame, prefix: str = CORBEL_TYPE_PREFIX) -> tuple:
+    """(type label per row, type schedule) from corbel_frame_by_type results, sorted by V, H."""
+    key = pd.DataFrame({"V_design": res["V_design"], "H_design": res["H_design"]})
+    codes, types = sorted_types(key)
+    labels = type_labels(len(types), prefix)
+    first = np.zeros(len(types), dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes))[::-1]
+    for c in ("As1", "As2"):
+        types[c] = res[c].to_numpy()[first]
+    types.insert(0, "Type", labels)
+    types["n_corbels"] = np.bincount(codes, minlength=len(types))
+    types["Locations"] = _members(loads["Location"], codes)
+    return labels[codes], types
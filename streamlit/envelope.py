@@ -0,0 +1,187 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Load-combination envelopes for the corbel and column tools.
+
+RFEM results come as one row per member and load combination. Each table
+is reduced to one governing row per member with a single grouped
+reduction (factorize + lexsort, no groupby.apply), and the design then
+runs on the governing rows only:
+
+- corbels: the combination with the largest As1 (z0 <= 0 always governs),
+  with its concurrent V and H
+- columns: max and min N per column and section (a Column_ID reused with
+  another section, e.g. per storey, stays a separate row); the one that
+  needs more steel is the design NEd_kN
+
+"""
+import numpy as np
+import pandas as pd
+
+from column_engine import numeric_column, required_steel_area_mm2, section_area_concrete_mm2
+from corbel_calc import corbel_frame, load_arrays
+from corbel_core import calc_corbel
+from incremental import row_hashes
+from rfem_io import INPUT_COLUMNS
+from table_schema import CORBEL_SCHEMA, SCHEDULE_SCHEMA, apply_schema
+
+COMBINATION = "Combination"
+N_COMBINATIONS = "n_combinations"
+
+CORBEL_COLUMNS = ["Location", COMBINATION, "V", "H"]
+# rows are combinations of one column only if all of these match
+COLUMN_GROUP_KEY = ["Column_ID", "Shape", "b_mm", "h_mm", "D_mm", "fck_MPa", "cover_mm"]
+
+
+def group_argmax(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Row index of the largest value per group code 0, 1, ... (rows with code
+    -1 are ignored). NaN never governs, ties go to the first row.
+    """
+    codes = np.asarray(codes)
+    values = np.where(np.isnan(values), -np.inf, np.asarray(values, dtype=float))
+    rows = np.flatnonzero(codes >= 0)
+    # sorted by group, then value, then reversed row number: the last row of each group wins
+    order = rows[np.lexsort((-rows, values[rows], codes[rows]))]
+    c = codes[order]
+    last = np.r_[c[1:] != c[:-1], True] if len(c) else np.zeros(0, dtype=bool)
+    return order[last]
+
+
+def governing_rows(df: pd.DataFrame, by: str, score: np.ndarray, codes: np.ndarray = None) -> pd.DataFrame:
+    """
+    Row with the largest score per `by` value, in order of first appearance,
+    with the number of rows (combinations) it stands for in n_combinations.
+    An existing n_combinations column is summed, so envelopes can be merged.
+    """
+    if codes is None:
+        codes, _ = pd.factorize(df[by])
+    idx = group_argmax(codes, score)
+    if N_COMBINATIONS in df.columns:
+        counts = df[N_COMBINATIONS].fillna(1).to_numpy(dtype=float)
+    else:
+        counts = np.ones(len(df))
+    ok = codes >= 0
+    n = np.bincount(codes[ok], weights=counts[ok], minlength=len(idx))
+    out = df.iloc[idx].reset_index(drop=True)
+    out[N_COMBINATIONS] = n[codes[idx]].astype(np.int64)
+    return out
+
+
+def with_combination(df: pd.DataFrame) -> pd.DataFrame:
+    if COMBINATION in df.columns:
+        return df
+    return df.assign(**{COMBINATION: ""})
+
+
+def needs_envelope(df: pd.DataFrame, by: str = None) -> bool:
+    """
+    True for long-format tables: a Combination column, or (only when by is
+    given, i.e. the caller has its own switch for it) repeated member names.
+    """
+    return COMBINATION in df.columns or (by is not None and bool(df[by].duplicated().any()))
+
+
+def corbel_envelope(df: pd.DataFrame, column_width, corbel_height, corbel_depth, pad_offset) -> pd.DataFrame:
+    """
+    Location, Combination, V, H of the governing combination per corbel
+    (largest As1, a combination with z0 <= 0 ahead of all others) plus
+    n_combinations and z0, Zed, As1, As2 of that row.
+    """
+    df = with_combination(df)
+    V, H = load_arrays(df)
+    res = calc_corbel(V, H, column_width, corbel_height, corbel_depth, pad_offset)
+    score = np.where(res.valid, res.As1, np.inf)
+    score[np.isnan(V) | np.isnan(H)] = np.nan
+    keep = CORBEL_COLUMNS + ([N_COMBINATIONS] if N_COMBINATIONS in df.columns else [])
+    gov = governing_rows(df[keep], "Location", score)
+    return pd.concat([gov, corbel_frame(gov, column_width, corbel_height, corbel_depth, pad_offset)], axis=1)
+
+
+def corbel_envelope_chunks(chunks, column_width, corbel_height, corbel_depth, pad_offset) -> pd.DataFrame:
+    """corbel_envelope over load chunks (e.g. corbel_calc.iter_csv_chunks), only the running envelope is kept."""
+    env = None
+    for chunk in chunks:
+        chunk = with_combination(chunk)
+        part = chunk if env is None else pd.concat([env[CORBEL_COLUMNS + [N_COMBINATIONS]], chunk], ignore_index=True)
+        env = corbel_envelope(part, column_width, corbel_height, corbel_depth, pad_offset)
+    if env is None:
+        return pd.DataFrame(columns=CORBEL_COLUMNS + [N_COMBINATIONS, "z0", "Zed", "As1", "As2"])
+    # chunks bring their own categories, unified once on the (small) envelope
+    return apply_schema(env, CORBEL_SCHEMA)
+
+
+def column_envelope(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Long schedule input (one row per column and combination) -> one row per
+    Column_ID and section (COLUMN_GROUP_KEY) with max / min NEd_kN and
+    their combinations. NEd_kN and Combination are those of the extreme
+    that needs more steel (max N on a tie); rows with the same ID but
+    another section or material are never merged.
+    """
+    df = with_combination(df)
+    N = pd.to_numeric(df["NEd_kN"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = pd.factorize(row_hashes(df, [c for c in COLUMN_GROUP_KEY if c in df.columns]))
+    hi = governing_rows(df, "Column_ID", N, codes)
+    lo = governing_rows(df, "Column_ID", -N, codes)
+
+    Ac = section_area_concrete_mm2(hi)
+    fck = numeric_column(hi, "fck_MPa")
+    As_hi = required_steel_area_mm2(numeric_column(hi, "NEd_kN"), fck, Ac)
+    As_lo = required_steel_area_mm2(numeric_column(lo, "NEd_kN"), fck, Ac)
+    use_lo = np.nan_to_num(As_lo, nan=-np.inf) > np.nan_to_num(As_hi, nan=-np.inf)
+
+    out = hi.copy()
+    for c in ("NEd_kN", COMBINATION):
+        # keeps the input dtypes (Float32 / categorical, see table_schema)
+        out[c] = hi[c].where(~use_lo, lo[c])
+    out["NEd_max_kN"] = hi["NEd_kN"]
+    out["Combination_max"] = hi[COMBINATION]
+    out["NEd_min_kN"] = lo["NEd_kN"]
+    out["Combination_min"] = lo[COMBINATION]
+    extra = [c for c in out.columns if c not in INPUT_COLUMNS]
+    return out[INPUT_COLUMNS + extra]
+
+
+def _column_extremes(df: pd.DataFrame) -> pd.DataFrame:
+    """Max and min NEd_kN row per column and section; the min rows count 0 combinations, so counts add up."""
+    df = with_combination(df)
+    N = pd.to_numeric(df["NEd_kN"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = pd.factorize(row_hashes(df, [c for c in COLUMN_GROUP_KEY if c in df.columns]))
+    hi = governing_rows(df, "Column_ID", N, codes)
+    lo = governing_rows(df, "Column_ID", -N, codes)
+    lo[N_COMBINATIONS] = 0
+    return pd.concat([hi, lo], ignore_index=True)
+
+
+def column_envelope_chunks(chunks) -> pd.DataFrame:
+    """
+    column_envelope over schedule chunks (e.g. rfem_io.iter_xlsx_chunks):
+    only the max / min rows per column seen so far are kept between chunks.
+    """
+    kept = None
+    for chunk in chunks:
+        kept = _column_extremes(chunk if kept is None else pd.concat([kept, with_combination(chunk)], ignore_index=True))
+    if kept is None:
+        return column_envelope(pd.DataFrame(columns=INPUT_COLUMNS))
+    # chunks bring their own categories, unified once on the (small) extremes
+    return column_envelope(apply_schema(kept, SCHEDULE_SCHEMA))
+
+
+def attach_member_forces(schedule_input: pd.DataFrame, forces: pd.DataFrame, prefix: str = "M") -> pd.DataFrame:
+    """
+    Long schedule input from one row per column (e.g. rf5_io.read_rf5_schedule)
+    and RFEM member forces (rfem_io.read_member_forces): Column_ID is
+    prefix + member number, NEd_kN = -N (RFEM: tension positive, here
+    compression positive). Columns without forces keep one row with their NEd_kN.
+    """
+    f = pd.DataFrame({
+        "Column_ID": prefix + forces["member"].astype("Int64").astype(str),
+        COMBINATION: forces[COMBINATION].astype(str),
+        "N_rfem": -forces["N"].to_numpy(dtype=float),
+    })
+    long = schedule_input.merge(f, on="Column_ID", how="left", sort=False)
+    long["NEd_kN"] = long["N_rfem"].where(long["N_rfem"].notna(), long["NEd_kN"])
+    long[COMBINATION] = long[COMBINATION].fillna("")
+    return long.drop(columns="N_rfem")
@@ -0,0 +1,128 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Startup cost of the Streamlit apps.
+
+Run with:
+
+python import_times.py                          # all apps
+python import_times.py corbel.py --top 15
+python import_times.py --json times.json        # save as baseline
+python import_times.py --baseline times.json    # exit 1 on a regression
+
+Each app gets its first run (default widgets, as after a cold start) in a
+fresh interpreter under `python -X importtime`, through the Streamlit
+AppTest runner. Everything imported before the app starts (Streamlit
+itself, the test runner) is the shared baseline and is not counted, so
+the reported import time is what the app adds on top of Streamlit:
+its own modules plus the heavy libraries it pulls in on the default path.
+
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+APPS = ("corbel.py", "column_schedule.py", "MMC.py", "MMC2.py")
+MARKER = "__designflow_app_start__"
+
+# regression if slower than baseline by both this factor and this many ms (import times are noisy)
+TOLERANCE = 1.25
+TOLERANCE_MS = 50.0
+
+CHILD = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write("{MARKER}\\n")
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+sys.stderr.write("{MARKER} %.6f %d\\n" % (time.perf_counter() - t0, len(at.exception)))
+"""
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """
+    -X importtime output after the marker -> (top-level modules with their
+    cumulative us, first-run seconds, number of exceptions).
+    """
+    modules, run_s, n_exc, started = {}, None, None, False
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            parts = line.split()
+            if len(parts) == 3:
+                run_s, n_exc = float(parts[1]), int(parts[2])
+            started = True
+            continue
+        m = _LINE.match(line)
+        if started and m and len(m.group(3)) == 1:  # one space: imported directly, not as a dependency
+            name = m.group(4)
+            modules[name] = modules.get(name, 0) + int(m.group(2))
+    return modules, run_s, n_exc
+
+
+def measure(app: str) -> dict:
+    path = APP_DIR / app
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, str(path)],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    modules, run_s, n_exc = parse_importtime(proc.stderr)
+    if run_s is None:
+        raise RuntimeError(f"{app} did not finish:\n{proc.stderr[-2000:]}")
+    return {
+        "app": app,
+        "import_ms": sum(modules.values()) / 1000,
+        "first_run_s": run_s,
+        "exceptions": n_exc,
+        "modules_ms": {k: v / 1000 for k, v in sorted(modules.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def regressions(results: list, baseline: dict) -> list:
+    out = []
+    for r in results:
+        old = baseline.get(r["app"])
+        if old is None:
+            continue
+        limit = max(old["import_ms"] * TOLERANCE, old["import_ms"] + TOLERANCE_MS)
+        if r["import_ms"] > limit:
+            out.append(f"{r['app']}: {r['import_ms']:.0f} ms imports (baseline {old['import_ms']:.0f} ms)")
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import time / first run of the Streamlit apps (-X importtime).")
+    parser.add_argument("apps", nargs="*", default=list(APPS), help=f"app scripts (default: {' '.join(APPS)})")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports listed per app")
+    parser.add_argument("--json", type=Path, default=None, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier --json output, exit 1 on a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for app in args.apps:
+        r = measure(app)
+        results.append(r)
+        print(f"{r['app']}: {r['import_ms']:.0f} ms imports on top of Streamlit, first run {r['first_run_s']:.2f} s"
+              + (f", {r['exceptions']} exception(s)" if r["exceptions"] else ""))
+        for name, ms in list(r["modules_ms"].items())[:args.top]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    if args.json:
+        args.json.write_text(json.dumps({r["app"]: r for r in results}, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        found = regressions(results, json.loads(args.baseline.read_text(encoding="utf-8")))
+        for line in found:
+            print("REGRESSION " + line)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
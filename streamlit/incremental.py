@@ -0,0 +1,65 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Incremental recompute for the data_editor tables.
+
+Every input row is hashed and compared with the snapshot of the last
+calculation. Only added or changed rows go through the calculation again,
+results of unchanged rows are taken from the snapshot and merged back in
+table order. A change of the design parameters invalidates the snapshot.
+
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Snapshot:
+    hashes: np.ndarray      # uint64 hash per input row, in table order
+    results: pd.DataFrame   # calculation output, positionally aligned with hashes
+    params: tuple           # design parameters the results were computed with
+
+
+def row_hashes(df: pd.DataFrame, columns=None) -> np.ndarray:
+    """One uint64 per row over the given columns (index ignored)."""
+    if columns is not None:
+        df = df[list(columns)]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def match_rows(hashes: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Position of each row's hash in `previous`, -1 for new / changed rows."""
+    if len(previous) == 0:
+        return np.full(len(hashes), -1)
+    uniq, first = np.unique(previous, return_index=True)
+    loc = np.minimum(np.searchsorted(uniq, hashes), len(uniq) - 1)
+    found = uniq[loc] == hashes
+    return np.where(found, first[loc], -1)
+
+
+def recompute_changed(df: pd.DataFrame, snapshot: Snapshot, compute, columns=None, params: tuple = ()):
+    """
+    compute(part) -> DataFrame indexed like part.
+    Returns (results indexed like df, new snapshot, number of recomputed rows).
+    """
+    hashes = row_hashes(df, columns)
+    if snapshot is None or snapshot.params != params:
+        pos = np.full(len(df), -1)
+    else:
+        pos = match_rows(hashes, snapshot.hashes)
+
+    changed = pos < 0
+    n_changed = int(changed.sum())
+
+    if n_changed == len(df):
+        results = compute(df)
+    else:
+        parts = [snapshot.results.iloc[pos[~changed]].set_axis(df.index[~changed])]
+        if n_changed:
+            parts.append(compute(df[changed]))
+        results = pd.concat(parts).reindex(df.index)
+
+    return results, Snapshot(hashes, results, params), n_changed
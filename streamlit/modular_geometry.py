@@ -0,0 +1,190 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Layout and merged 3D geometry for the Modular Asset Configurator (MMC2.py).
+
+building_layout() places the units column by column on a rectangular or
+L-shaped footprint grid with a height limit per column, as whole arrays
+(no loop over units), so it is fast enough to rerun on every slider move
+with tens of thousands of units.
+
+All blocks of a building are turned into one vertex / triangle array for a
+single go.Mesh3d and one edge polyline (NaN separated) for a single
+go.Scatter3d, built with NumPy instead of two traces per block. Corners
+and edges shared by neighbouring blocks are only sent once, and arrays are
+float32 / int32 so Plotly ships them as compact binary buffers.
+
+"""
+from typing import NamedTuple
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Block dimensions (1:3:1 horizontal ratio)
+BLOCK_DIMS = (1, 3, 1)
+
+FOOTPRINTS = ("Rectangular", "L-shaped")
+HEIGHT_PROFILES = ("Uniform", "Terraced")
+L_CUTOUT = 0.5  # L-shape: the far corner quadrant (this fraction of both sides) stays empty
+
+# Unit box corners (x, y, z), same order as the former per-block Mesh3d
+BOX_CORNERS = np.array([
+    [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+    [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+], dtype=np.float32)
+
+# 12 triangles per box (corner indices)
+BOX_TRIANGLES = np.array([
+    [7, 3, 0], [0, 4, 7], [0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 7],
+    [6, 5, 1], [6, 2, 1], [4, 0, 5], [0, 1, 5], [3, 6, 7], [2, 3, 6],
+], dtype=np.int32)
+
+# 12 edges per box (corner indices)
+BOX_EDGES = np.array([
+    [0, 1], [1, 2], [2, 3], [3, 0],
+    [4, 5], [5, 6], [6, 7], [7, 4],
+    [0, 4], [1, 5], [2, 6], [3, 7],
+], dtype=np.int32)
+
+MESH_COLOR = '#cbd5e1'
+EDGE_COLOR = '#1e293b'
+
+
+class Layout(NamedTuple):
+    coords: np.ndarray   # (n, 3) block origins
+    dims: tuple          # (w, l, h) of one block
+    grid: tuple          # (nx, ny) footprint grid
+    cells: np.ndarray    # (c, 2) grid cells (i, j) of the footprint, filling order
+    limits: np.ndarray   # (c,) height limit per cell [storeys]
+    heights: np.ndarray  # (c,) storeys placed per cell
+
+    @property
+    def n_units(self):
+        return len(self.coords)
+
+    @property
+    def footprint_columns(self):
+        return int(np.count_nonzero(self.heights))
+
+    @property
+    def footprint_area(self):
+        w, l, _ = self.dims
+        return self.footprint_columns * w * l
+
+    @property
+    def max_storeys(self):
+        return int(self.heights.max(initial=0))
+
+    @property
+    def mean_storeys(self):
+        used = self.heights[self.heights > 0]
+        return float(used.mean()) if len(used) else 0.0
+
+    @property
+    def coverage(self):
+        """Used columns / footprint cells."""
+        return self.footprint_columns / len(self.cells) if len(self.cells) else 0.0
+
+
+def footprint_cells(nx, ny, footprint="Rectangular"):
+    """(c, 2) cells (i, j) of an nx x ny grid in row-major order."""
+    i, j = np.divmod(np.arange(nx * ny), ny)
+    if footprint == "L-shaped":
+        keep = (i < np.ceil(nx * (1 - L_CUTOUT))) | (j < np.ceil(ny * (1 - L_CUTOUT)))
+        i, j = i[keep], j[keep]
+    elif footprint != "Rectangular":
+        raise ValueError(f"Unknown footprint '{footprint}', expected one of {FOOTPRINTS}")
+    return np.stack([i, j], axis=1)
+
+
+def height_limits(cells, max_height, profile="Uniform"):
+    """Storey limit per cell; 'Terraced' steps down from max_height at the origin corner to 1."""
+    if profile == "Uniform":
+        return np.full(len(cells), max_height, dtype=np.int64)
+    if profile == "Terraced":
+        dist = cells.max(axis=1)  # Chebyshev rings around the origin corner
+        rings = max(int(dist.max(initial=0)), 1)
+        return np.maximum(1, max_height - (dist * (max_height - 1)) // rings).astype(np.int64)
+    raise ValueError(f"Unknown height profile '{profile}', expected one of {HEIGHT_PROFILES}")
+
+
+def _grid(side, aspect):
+    return max(1, int(np.ceil(side * aspect))), side
+
+
+def building_layout(total_units, max_height, footprint="Rectangular", profile="Uniform",
+                    aspect=1.0, dims=BLOCK_DIMS):
+    """
+    Smallest footprint grid (ny = side, nx = ceil(side * aspect)) whose
+    capacity holds total_units, filled column by column in row-major order.
+    With the defaults this is the former square-grid layout.
+    """
+    total_units = int(total_units)
+    side = max(1, int(np.ceil(np.sqrt(np.ceil(total_units / max_height) / aspect))))
+    while True:
+        nx, ny = _grid(side, aspect)
+        cells = footprint_cells(nx, ny, footprint)
+        limits = height_limits(cells, max_height, profile)
+        if limits.sum() >= total_units:
+            break
+        side += 1
+
+    # storeys per column: full columns up to the limit, then the remainder, then empty
+    before = np.cumsum(limits) - limits
+    heights = np.clip(total_units - before, 0, limits)
+
+    col = np.repeat(np.arange(len(cells)), heights)
+    k = np.arange(total_units) - np.repeat(before, heights)
+    w, l, h = dims
+    coords = np.stack([cells[col, 0] * w, cells[col, 1] * l, k * h], axis=1).astype(np.float32)
+    return Layout(coords, tuple(dims), (nx, ny), cells, limits, heights)
+
+
+def block_vertices(origins, dims):
+    """(n, 3) block origins, (w, l, h) -> (n, 8, 3) corner coordinates."""
+    origins = np.asarray(origins, dtype=np.float32).reshape(-1, 3)
+    size = np.asarray(dims, dtype=np.float32)
+    return origins[:, None, :] + BOX_CORNERS[None, :, :] * size
+
+
+def shared_vertices(corners, tol=1e-3):
+    """Corners shared by neighbouring blocks become one vertex: (vertices, (n, 8) index)."""
+    flat = corners.reshape(-1, 3)
+    # one int64 key per corner on a tol grid, much faster than np.unique(axis=0)
+    q = np.round((flat - flat.min(axis=0)) / tol).astype(np.int64)
+    span = q.max(axis=0) + 1
+    keys = (q[:, 0] * span[1] + q[:, 1]) * span[2] + q[:, 2]
+    _, first, index = np.unique(keys, return_index=True, return_inverse=True)
+    return flat[first], index.reshape(len(corners), 8).astype(np.int32)
+
+
+def mesh_triangles(index):
+    """(n, 8) vertex index -> (12n, 3) triangle indices."""
+    return index[:, BOX_TRIANGLES].reshape(-1, 3)
+
+
+def edge_polyline(verts, index):
+    """Every distinct box edge once, (3e, 3) with a NaN row after every segment."""
+    pairs = np.sort(index[:, BOX_EDGES].reshape(-1, 2), axis=1).astype(np.int64)
+    pairs = np.unique(pairs[:, 0] * len(verts) + pairs[:, 1])
+    segments = verts[np.stack([pairs // len(verts), pairs % len(verts)], axis=1)]  # (e, 2, 3)
+    gap = np.full((len(segments), 1, 3), np.nan, dtype=np.float32)
+    return np.concatenate([segments, gap], axis=1).reshape(-1, 3)
+
+
+def building_traces(origins, dims, opacity=0.4, edge_width=4):
+    """One Mesh3d for all volumes + one Scatter3d for all edges."""
+    verts, index = shared_vertices(block_vertices(origins, dims))
+    tris = mesh_triangles(index)
+    edges = edge_polyline(verts, index)
+    mesh = go.Mesh3d(
+        x=verts[:, 0], y=verts[:, 1], z=verts[:, 2],
+        i=tris[:, 0], j=tris[:, 1], k=tris[:, 2],
+        opacity=opacity, color=MESH_COLOR, flatshading=True, showlegend=False, hoverinfo='none',
+    )
+    lines = go.Scatter3d(
+        x=edges[:, 0], y=edges[:, 1], z=edges[:, 2], mode='lines', connectgaps=False,
+        line=dict(color=EDGE_COLOR, width=edge_width), showlegend=False, hoverinfo='none',
+    )
+    return [mesh, lines]
@@ -0,0 +1,276 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Offline reader for native RFEM 5 model files (.rf5), no RFEM needed.
+
+An .rf5 is an OLE compound file. The model input sits in the stream
+'RFEM_Data <version>', a tree of typed tables: every table is stored as a
+byte size, the record count, the field definitions (name, type) and then
+the values record by record; nested tables carry their own byte size. Only
+that one stream is read, and only the tables on the requested paths are
+decoded, everything else is stepped over by its size. The file is never
+written to.
+
+The model does not contain calculation results: the design axial forces
+have to come from elsewhere (pass them as `forces`), otherwise NEd_kN is
+left empty in the schedule input.
+
+"""
+import re
+import struct
+
+import numpy as np
+import pandas as pd
+
+from rfem_io import INPUT_COLUMNS, coerce_input_frame
+
+DATA_STREAM = "RFEM_Data"
+
+# field types in the RFEM_Data tables
+T_STRING, T_BOOL, T_INT16, T_INT32, T_DOUBLE, T_TABLE = 0, 1, 2, 4, 8, 0xFE
+_FIXED = {T_BOOL: (1, "<B"), T_INT16: (2, "<h"), T_INT32: (4, "<i"), T_DOUBLE: (8, "<d")}
+
+NODES = ("Topology", "Nodes")
+LINES = ("Topology", "M1DPolyline")
+MEMBERS = ("Topology", "Elements")
+SECTIONS = ("Topology", "CrossSection")
+MATERIALS = ("Topology", "Materials")
+
+COLUMN_MEMBER_TYPES = ("Beam",)
+VERTICAL_TOL_M = 1e-6
+
+# English and German section names, dimensions in mm
+_RECT = re.compile(r"^(?:Rectangle|Rechteck)\s+(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)", re.I)
+_SQUARE = re.compile(r"^(?:Square|Quadrat)\s+(\d+(?:\.\d+)?)", re.I)
+_CIRC = re.compile(r"^(?:Circle|Kreis)\s+(\d+(?:\.\d+)?)", re.I)
+_CONCRETE = re.compile(r"\bC(\d+(?:\.\d+)?)/\d+")
+
+
+def _olefile():
+    try:
+        import olefile
+    except ImportError as e:
+        raise ImportError("Reading .rf5 files needs olefile (pip install olefile).") from e
+    return olefile
+
+
+def read_data_stream(file) -> bytes:
+    """The raw 'RFEM_Data' stream of an .rf5 (path, bytes or binary file object), opened read-only."""
+    olefile = _olefile()
+    if hasattr(file, "read"):
+        file.seek(0)
+        file = file.read()
+    if isinstance(file, (bytes, bytearray)) and not file.startswith(olefile.MAGIC) or not olefile.isOleFile(file):
+        raise ValueError("Not an RFEM 5 model: the file is not an OLE compound file (.rf5).")
+    ole = olefile.OleFileIO(file)
+    try:
+        names = [e[0] for e in ole.listdir() if len(e) == 1 and e[0].startswith(DATA_STREAM)]
+        if not names:
+            raise ValueError(f"No '{DATA_STREAM}' stream in the file, is it an RFEM 5 model?")
+        with ole.openstream(names[0]) as stream:
+            return stream.read()
+    finally:
+        ole.close()
+
+
+def _count(d: bytes, p: int) -> tuple:
+    # one byte, or 0xff followed by a uint16
+    c = d[p]
+    if c == 0xFF:
+        return struct.unpack_from("<H", d, p + 1)[0], p + 3
+    return c, p + 1
+
+
+def _fields(d: bytes, p: int) -> tuple:
+    nf, p = _count(d, p)
+    fields = []
+    for _ in range(nf):
+        n = d[p]
+        name = d[p + 1:p + 1 + n].decode("latin-1")
+        fields.append((name, d[p + 1 + n]))
+        p += n + 2
+    return fields, p
+
+
+def _value(d: bytes, p: int, t: int, keep: bool):
+    """(value or None, position after it); nested tables are only decoded if kept."""
+    if t in _FIXED:
+        size, fmt = _FIXED[t]
+        return (struct.unpack_from(fmt, d, p)[0] if keep else None), p + size
+    if t == T_STRING:
+        n, p = _count(d, p)
+        return (d[p:p + n].decode("latin-1") if keep else None), p + n
+    if t == T_TABLE:
+        end = p + 4 + struct.unpack_from("<I", d, p)[0]
+        return (decode_table(d, p) if keep else None), end
+    raise ValueError(f"Unknown field type {t} at byte {p} of the RFEM data stream.")
+
+
+def decode_table(d: bytes, p: int, columns=None) -> list:
+    """Records (dicts) of the table at p; `columns` limits the decoded fields, the rest is skipped."""
+    end = p + 4 + struct.unpack_from("<I", d, p)[0]
+    nrec, p = _count(d, p + 4)
+    if nrec == 0:
+        return []
+    fields, p = _fields(d, p)
+    keep = [columns is None or name in columns for name, _ in fields]
+    records = []
+    for _ in range(nrec):
+        rec = {}
+        for (name, t), k in zip(fields, keep):
+            value, p = _value(d, p, t, k)
+            if k:
+                rec[name] = value
+        records.append(rec)
+    if p != end:
+        raise ValueError(f"RFEM data table at byte {end} has an unexpected layout.")
+    return records
+
+
+def _root(d: bytes) -> int:
+    # b'\x01\x01', name length, 'InputData', table type, table
+    n = d[2] if len(d) > 3 and d[:2] == b"\x01\x01" else 0
+    if not n or d[3 + n] != T_TABLE:
+        raise ValueError("Unexpected header of the RFEM data stream (only RFEM 5 models are supported).")
+    return 4 + n
+
+
+def find_table(d: bytes, path) -> int:
+    """Byte offset of the table at `path` (names of nested fields in the first record of each level)."""
+    p = _root(d)
+    for name in path:
+        nrec, q = _count(d, p + 4)
+        if nrec == 0:
+            raise KeyError(f"RFEM table '{'/'.join(path)}' not found (empty parent).")
+        fields, q = _fields(d, q)
+        for field, t in fields:
+            if field == name and t == T_TABLE:
+                p = q
+                break
+            _, q = _value(d, q, t, keep=False)
+        else:
+            raise KeyError(f"RFEM table '{'/'.join(path)}' not found.")
+    return p
+
+
+def read_rf5_tables(file, paths, columns=None) -> dict:
+    """{path: records} for the requested table paths, e.g. read_rf5_tables(f, [NODES, MEMBERS])."""
+    d = read_data_stream(file)
+    return {tuple(path): decode_table(d, find_table(d, path), columns) for path in paths}
+
+
+def _numbers(value) -> list:
+    # 'Numbers' sub-tables hold int32 lists packed into a string field
+    if not value:
+        return []
+    return np.frombuffer(value[0]["Numbers"].encode("latin-1"), dtype="<i4").tolist()
+
+
+def parse_section(name: str) -> tuple:
+    """(Shape, b_mm, h_mm, D_mm) of a concrete section name, Shape None if it is not RECT / CIRC."""
+    name = (name or "").strip()
+    m = _RECT.match(name)
+    if m:
+        return "RECT", float(m.group(1)), float(m.group(2)), np.nan
+    m = _SQUARE.match(name)
+    if m:
+        return "RECT", float(m.group(1)), float(m.group(1)), np.nan
+    m = _CIRC.match(name)
+    if m:
+        return "CIRC", np.nan, np.nan, float(m.group(1))
+    return None, np.nan, np.nan, np.nan
+
+
+def concrete_fck(name: str) -> float:
+    """fck in MPa from a material name like 'Concrete C30/37', NaN for other materials."""
+    m = _CONCRETE.search(name or "")
+    return float(m.group(1)) if m else np.nan
+
+
+def rf5_members(file) -> pd.DataFrame:
+    """
+    One row per member: number, type, end nodes, vertical flag, section
+    name / shape / dimensions and material fck, straight from the model.
+    """
+    d = read_data_stream(file)
+    nodes = decode_table(d, find_table(d, NODES), {"No", "XYZZadx", "XYZZady", "XYZZadz"})
+    lines = decode_table(d, find_table(d, LINES), {"No", "Nodes"})
+    members = decode_table(d, find_table(d, MEMBERS), {"No", "ElemTypeE", "Curve", "CrSc"})
+    sections = decode_table(d, find_table(d, SECTIONS), {"No", "Name", "Name1", "Material"})
+    materials = decode_table(d, find_table(d, MATERIALS), {"No", "Name"})
+
+    xyz = {n["No"]: (n["XYZZadx"], n["XYZZady"], n["XYZZadz"]) for n in nodes}
+    line_nodes = {ln["No"]: _numbers(ln["Nodes"]) for ln in lines}
+    fck = {m["No"]: concrete_fck(m["Name"]) for m in materials}
+    section = {}
+    for s in sections:
+        shape = parse_section(s["Name"])
+        if shape[0] is None:
+            shape = parse_section(s["Name1"])
+        section[s["No"]] = (s["Name"], *shape, fck.get(s["Material"], np.nan))
+
+    rows = []
+    for m in members:
+        ends = line_nodes.get(m["Curve"], [])
+        start, end = (xyz.get(ends[0]), xyz.get(ends[-1])) if ends else (None, None)
+        vertical = bool(
+            start and end
+            and abs(start[0] - end[0]) < VERTICAL_TOL_M and abs(start[1] - end[1]) < VERTICAL_TOL_M
+            and abs(start[2] - end[2]) >= VERTICAL_TOL_M
+        )
+        crsc = _numbers(m["CrSc"])
+        name, shape, b, h, D, f = section.get(crsc[0] if crsc else None, ("", None, np.nan, np.nan, np.nan, np.nan))
+        rows.append({
+            "member": m["No"],
+            "type": m["ElemTypeE"],
+            "line": m["Curve"],
+            "node_start": ends[0] if ends else None,
+            "node_end": ends[-1] if ends else None,
+            "length_m": float(np.linalg.norm(np.subtract(end, start))) if start and end else np.nan,
+            "vertical": vertical,
+            "section": name,
+            "Shape": shape,
+            "b_mm": b,
+            "h_mm": h,
+            "D_mm": D,
+            "fck_MPa": f,
+        })
+    return pd.DataFrame(rows)
+
+
+def column_members(members: pd.DataFrame) -> pd.DataFrame:
+    """Vertical beam members with a rectangular / circular concrete section."""
+    ok = (
+        members["type"].isin(COLUMN_MEMBER_TYPES)
+        & members["vertical"]
+        & members["Shape"].notna()
+        & members["fck_MPa"].notna()
+    )
+    return members[ok]
+
+
+def read_rf5_schedule(file, cover_mm: float = np.nan, forces=None) -> pd.DataFrame:
+    """
+    Schedule input (the frame read_uploaded_xlsx returns) from the columns
+    of an .rf5 model. Column_ID is 'M' + the RFEM member number. `forces`
+    maps member numbers (or Column_IDs) to NEd_kN; without it NEd_kN is
+    NaN, since the model file holds no results.
+    """
+    cols = column_members(rf5_members(file))
+    df = pd.DataFrame({
+        "Column_ID": "M" + cols["member"].astype(str),
+        "Shape": cols["Shape"],
+        "b_mm": cols["b_mm"],
+        "h_mm": cols["h_mm"],
+        "D_mm": cols["D_mm"],
+        "NEd_kN": np.nan,
+        "fck_MPa": cols["fck_MPa"],
+        "cover_mm": cover_mm,
+    })
+    if forces is not None:
+        forces = pd.Series(forces, dtype=float)
+        forces.index = forces.index.map(str)
+        by_member = cols["member"].astype(str).map(forces)
+        df["NEd_kN"] = by_member.where(by_member.notna(), df["Column_ID"].map(forces))
+    return coerce_input_frame(df.reset_index(drop=True)[INPUT_COLUMNS])
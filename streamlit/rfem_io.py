@@ -0,0 +1,143 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Streaming reader for RFEM Excel exports.
+
+Workbooks are opened read-only and walked row by row, keeping only the
+columns the schedule needs. Rows are collected into fixed-size chunks and
+coerced to proper dtypes as they go, so peak memory depends on the chunk
+size and not on the size of the export.
+
+"""
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from table_schema import SCHEDULE_SCHEMA, apply_schema
+
+REQUIRED_COLUMNS = ["Column_ID", "Shape", "NEd_kN", "fck_MPa", "cover_mm"]
+GEOMETRY_COLUMNS = ["b_mm", "h_mm", "D_mm"]
+INPUT_COLUMNS = ["Column_ID", "Shape", "b_mm", "h_mm", "D_mm", "NEd_kN", "fck_MPa", "cover_mm"]
+NUMERIC_COLUMNS = ["b_mm", "h_mm", "D_mm", "NEd_kN", "fck_MPa", "cover_mm"]
+# load combination of the row, kept if present (long format, see envelope.py)
+OPTIONAL_COLUMNS = ["Combination"]
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def coerce_input_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Column order / dtypes of the schedule input (table_schema.SCHEDULE_SCHEMA), missing numeric columns empty."""
+    df = df.assign(**{c: np.nan for c in NUMERIC_COLUMNS if c not in df.columns})
+    optional = [c for c in OPTIONAL_COLUMNS if c in df.columns]
+    return apply_schema(df[INPUT_COLUMNS + optional], SCHEDULE_SCHEMA)
+
+
+def _header_index(header) -> dict:
+    # Normalize column names (basic)
+    names = ["" if c is None else str(c).strip() for c in header]
+    for c in REQUIRED_COLUMNS:
+        if c not in names:
+            raise ValueError(f"Missing required column '{c}' in uploaded file.")
+    return {c: names.index(c) for c in INPUT_COLUMNS + OPTIONAL_COLUMNS if c in names}
+
+
+def iter_xlsx_chunks(file, chunksize: int = DEFAULT_CHUNKSIZE, sheet_name: str = None):
+    """
+    Yield coerced input frames of at most `chunksize` rows from the first
+    (or the named) sheet. Blank rows are skipped.
+    """
+    from openpyxl import load_workbook  # only imported once a file is uploaded
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("Uploaded file is empty.")
+
+        index = _header_index(header)
+        columns = list(index)
+        width = max(index.values()) + 1
+        pick = itemgetter(*index.values())
+
+        buf = []
+        start = 0
+        for row in rows:
+            if len(row) < width:
+                # read-only sheets can return short rows when trailing cells are empty
+                row = tuple(row) + (None,) * (width - len(row))
+            values = pick(row)
+            if all(v is None for v in values):
+                continue
+            buf.append(values)
+            if len(buf) >= chunksize:
+                yield _chunk_frame(buf, columns, start)
+                start += len(buf)
+                buf = []
+        if buf:
+            yield _chunk_frame(buf, columns, start)
+    finally:
+        wb.close()
+
+
+def _chunk_frame(buf, columns, start) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(buf, columns=columns)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return coerce_input_frame(df)
+
+
+def read_uploaded_xlsx(file, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    Expects columns similar to the manual input:
+    Column_ID, Shape, b_mm, h_mm, D_mm, NEd_kN, fck_MPa, cover_mm
+    Only these columns are read, chunk by chunk, but the chunks are joined
+    into one table: the app needs all rows at once (envelope over the load
+    combinations, data editor, incremental recompute). Only the reading is
+    bounded by the chunk size; streaming through the whole file is
+    batch_run.py with iter_xlsx_chunks.
+    """
+    chunks = list(iter_xlsx_chunks(file, chunksize=chunksize))
+    if not chunks:
+        return coerce_input_frame(pd.DataFrame(columns=INPUT_COLUMNS))
+    # chunks have their own categories (Combination), unified once here
+    return apply_schema(pd.concat(chunks), SCHEDULE_SCHEMA)
+
+
+# RFEM 5 table "4.6 Members - Internal Forces" exported to Excel
+FORCE_COLUMNS = ["member", "node", "x_m", "extremum", "N", "Vy", "Vz", "MT", "My", "Mz", "Combination"]
+
+
+def read_member_forces(file, sheet_name: str = None) -> pd.DataFrame:
+    """
+    Long frame (one row per member, location and extremum) of the RFEM
+    member internal forces export: two header rows, member / node /
+    location only on the first row of each block, forces in kN / kNm,
+    N tension positive, Combination = the corresponding load case(s).
+    """
+    from openpyxl import load_workbook  # only imported once a file is uploaded
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        top, sub = next(rows, None), next(rows, None)
+        if top is None or sub is None or str(top[0]).strip() != "Member" or "N" not in sub:
+            raise ValueError("Not an RFEM member internal forces table (expected 'Member' / 'N' header rows).")
+        width = len(FORCE_COLUMNS)
+        records = [tuple(r[:width]) + (None,) * (width - len(r)) for r in rows if any(v is not None for v in r)]
+    finally:
+        wb.close()
+
+    df = pd.DataFrame.from_records(records, columns=FORCE_COLUMNS)
+    # member / node / location are merged cells: forward fill over each block
+    df[["member", "node", "x_m"]] = df[["member", "node", "x_m"]].ffill()
+    for c in ["member", "node", "x_m", "N", "Vy", "Vz", "MT", "My", "Mz"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df[df["member"].notna() & df["N"].notna()]
+    df["member"] = df["member"].astype(np.int64)
+    df["extremum"] = df["extremum"].fillna("").astype(str)
+    df["Combination"] = df["Combination"].fillna("").astype(str)
+    return df.reset_index(drop=True)
@@ -0,0 +1,175 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Export of the generated column schedule (xlsx / Parquet / CSV).
+
+The xlsx is written by xlsxwriter in constant_memory mode, in blocks of
+EXPORT_CHUNK_ROWS rows: only one block at a time is turned into Python
+cell values, so no copy of the whole schedule is built for the writer.
+The workbook has three sheets: the schedule, a summary by bar diameter
+and the rows with validation notes; the summary is aggregated with NumPy
+and only the rows with a note are picked for the issues sheet. CSV and
+Parquet (pyarrow, installed with Streamlit) are written in the same row
+blocks.
+
+Every export is written into a SpooledTemporaryFile that stays in memory
+for small schedules and moves to a temp file on disk once it grows past
+SPILL_BYTES, so writing needs memory for one row block plus the spool.
+The finished file is not memory-bounded in the app: st.download_button
+reads any stream into bytes and keeps them in Streamlit's in-memory media
+storage, so export_bytes hands over the file as bytes once and closes the
+spool right away.
+
+"""
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SPILL_BYTES = 32 * 1024 * 1024
+EXPORT_CHUNK_ROWS = 10_000
+
+SCHEDULE_SHEET = "Column_Schedule"
+SUMMARY_SHEET = "Summary_by_Bar"
+ISSUES_SHEET = "Validation_Issues"
+
+FORMATS = {
+    "xlsx": ("column_schedule.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("column_schedule.parquet", "application/vnd.apache.parquet"),
+    "csv": ("column_schedule.csv", "text/csv"),
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def spool():
+    """Binary buffer in memory up to SPILL_BYTES, on disk beyond."""
+    return tempfile.SpooledTemporaryFile(max_size=SPILL_BYTES, mode="w+b")
+
+
+def read_all(buf) -> bytes:
+    buf.seek(0)
+    return buf.read()
+
+
+def _cell_columns(df: pd.DataFrame) -> list:
+    """One object array per column with None for missing values (blank cells)."""
+    cols = []
+    for name in df.columns:
+        s = df[name]
+        if s.dtype in ("Float32", "float32"):
+            # shortest decimal of the float32 (75.24, not its float64 value 75.2399978...)
+            s = pd.Series(s.to_numpy(dtype=np.float32, na_value=np.nan).astype(str).astype(float), index=s.index)
+        values = s.to_numpy(dtype=object)
+        values[s.isna().to_numpy()] = None
+        cols.append(values)
+    return cols
+
+
+def _write_rows(ws, first_row: int, columns: list) -> int:
+    # constant_memory: rows must be written in order and are flushed as soon as the next starts
+    for r, row in enumerate(zip(*columns), start=first_row):
+        ws.write_row(r, 0, row)
+    return first_row + (len(columns[0]) if columns else 0)
+
+
+def bar_summary(out: pd.DataFrame) -> tuple:
+    """(header, columns) of the summary by bar diameter: columns, bars, As_provided and concrete area."""
+    d = out["bar_diam_mm"].to_numpy(dtype=float)
+    n = out["n_bars"].to_numpy(dtype=float)
+    As = out["As_provided_mm2"].to_numpy(dtype=float)
+    Ac = out["Ac_mm2"].to_numpy(dtype=float)
+    ok = ~np.isnan(d)
+    diams, group = np.unique(d[ok], return_inverse=True)
+
+    def total(values):
+        return np.bincount(group, weights=np.nan_to_num(values[ok]), minlength=len(diams))
+
+    count = np.bincount(group, minlength=len(diams))
+    As_sum = total(As)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rho = As_sum / total(Ac)
+    header = ["bar_diam_mm", "columns", "bars", "As_provided_mm2", "Ac_mm2", "rho_mean"]
+    return header, [diams, count, total(n), As_sum, total(Ac), np.where(np.isfinite(rho), rho, np.nan)]
+
+
+def write_xlsx(out: pd.DataFrame, buf) -> None:
+    """Schedule, summary by bar diameter and validation issues into buf (streamed, constant memory)."""
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True, "nan_inf_to_errors": True})
+    bold = wb.add_format({"bold": True})
+
+    ws = wb.add_worksheet(SCHEDULE_SHEET)
+    ws.write_row(0, 0, list(out.columns), bold)
+    ws.freeze_panes(1, 0)
+    row = 1
+    for start in range(0, len(out), EXPORT_CHUNK_ROWS):
+        row = _write_rows(ws, row, _cell_columns(out.iloc[start:start + EXPORT_CHUNK_ROWS]))
+
+    ws = wb.add_worksheet(SUMMARY_SHEET)
+    header, columns = bar_summary(out)
+    ws.write_row(0, 0, header, bold)
+    _write_rows(ws, 1, [c.tolist() for c in columns])
+
+    ws = wb.add_worksheet(ISSUES_SHEET)
+    issue = np.flatnonzero(out["Notes"].fillna("").ne("").to_numpy(dtype=bool))
+    ws.write_row(0, 0, ["Row", "Column_ID", "Notes"], bold)
+    rows = (issue + 2).tolist()  # Excel row of the column in the schedule sheet
+    picked = out.iloc[issue]
+    _write_rows(ws, 1, [rows, picked["Column_ID"].to_numpy(dtype=object), picked["Notes"].to_numpy(dtype=object)])
+
+    wb.close()
+
+
+def write_parquet(out: pd.DataFrame, buf) -> None:
+    if not parquet_available():
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow).")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for start in range(0, max(len(out), 1), EXPORT_CHUNK_ROWS):
+            table = pa.Table.from_pandas(out.iloc[start:start + EXPORT_CHUNK_ROWS], preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(buf, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_csv(out: pd.DataFrame, buf) -> None:
+    for start in range(0, max(len(out), 1), EXPORT_CHUNK_ROWS):
+        part = out.iloc[start:start + EXPORT_CHUNK_ROWS]
+        buf.write(part.to_csv(index=False, header=start == 0).encode("utf-8"))
+
+
+WRITERS = {"xlsx": write_xlsx, "parquet": write_parquet, "csv": write_csv}
+
+
+def export_schedule(out: pd.DataFrame, fmt: str = "xlsx"):
+    """Write the schedule in `fmt` to a spooled buffer, returned rewound to the start."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {list(WRITERS)}")
+    buf = spool()
+    try:
+        WRITERS[fmt](out, buf)
+    except Exception:
+        buf.close()
+        raise
+    buf.seek(0)
+    return buf
+
+
+def export_bytes(out: pd.DataFrame, fmt: str = "xlsx") -> bytes:
+    with export_schedule(out, fmt) as buf:
+        return read_all(buf)
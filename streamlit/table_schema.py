@@ -0,0 +1,98 @@
+"""
+Wyeth Binder
+Bollinger + Grohmann
+
+Column schemas of the in-memory tables (schedule input, corbel loads).
+
+A table is brought to its schema once, where it enters the app (upload
+readers, .rf5 reader, data editors), so the calculations get numbers and
+nothing is converted again on a rerun:
+
+- repeated text (Shape, Location, Combination) as categoricals, one small
+  integer code per row instead of a Python string
+- measures as Float32 and counts as Int16, both nullable (a mask instead
+  of None in an object column)
+- ids as pandas strings (pd.StringDtype, missing stays missing on pandas
+  2 as well)
+
+Shape starts from a fixed category list: values are matched
+case-insensitively, any other text is kept as an extra category (designed
+as rectangular with a note, see column_engine.validation_notes). Float32
+keeps about 7 significant digits, plenty for kN / mm / MPa inputs; the
+engines still calculate in float64.
+
+"""
+import pandas as pd
+
+SHAPES = ("RECT", "SQUARE", "CIRC", "CIRCULAR", "ROUND")
+SHAPE_DTYPE = pd.CategoricalDtype(SHAPES)
+TEXT_DTYPE = pd.StringDtype()
+
+SCHEDULE_SCHEMA = {
+    "Column_ID": TEXT_DTYPE,
+    "Shape": SHAPE_DTYPE,
+    "b_mm": "Float32",
+    "h_mm": "Float32",
+    "D_mm": "Float32",
+    "NEd_kN": "Float32",
+    "fck_MPa": "Float32",
+    "cover_mm": "Float32",
+    "Combination": "category",
+}
+
+# design results kept per session / in the cache
+SCHEDULE_RESULT_SCHEMA = {
+    "Type": "category",
+    "n_bars": "Int16",
+    "bar_diam_mm": "Float32",
+}
+
+CORBEL_SCHEMA = {
+    "V": "Float32",
+    "H": "Float32",
+    "Location": "category",
+    "Combination": "category",
+}
+
+
+def as_dtype(s: pd.Series, dtype, editable: bool = False) -> pd.Series:
+    """
+    s in dtype: text -> numbers (unreadable -> missing), fixed categories
+    matched in upper case and other text kept after them as extra
+    categories. editable: open categoricals ("category") stay strings, the
+    data editor cannot add new categories.
+    """
+    if editable and dtype == "category":
+        dtype = TEXT_DTYPE
+    if s.dtype == dtype:
+        return s
+    if isinstance(dtype, pd.CategoricalDtype):
+        known = list(dtype.categories)
+        if isinstance(s.dtype, pd.CategoricalDtype) and list(s.cat.categories[:len(known)]) == known:
+            return s  # fixed categories plus extras, typed already
+        text = s.astype(TEXT_DTYPE).str.strip()
+        upper = text.str.upper()
+        matched = upper.isin(known).fillna(False)
+        text = upper.where(matched, text)
+        extra = sorted(set(text[~matched].dropna()) - {""})
+        text = text.where(matched | text.isin(extra).fillna(False))
+        return text.astype(pd.CategoricalDtype(known + extra))
+    if isinstance(dtype, pd.StringDtype) or dtype == "category":
+        return s.astype(TEXT_DTYPE).astype(dtype)
+    return pd.to_numeric(s, errors="coerce").astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame, schema: dict, editable: bool = False) -> pd.DataFrame:
+    """
+    df with its schema columns in their dtypes, other columns untouched and
+    columns already in the right dtype not copied. Missing schema columns
+    are not added.
+    """
+    changed = {}
+    for name, dtype in schema.items():
+        if name in df.columns:
+            column = df[name]
+            s = as_dtype(column, dtype, editable)
+            if s is not column:
+                changed[name] = s
+    return df.assign(**changed) if changed else df
@@ -1,15 +1,28 @@
+from io import BytesIO
 from pathlib import Path
 
 
-from viktor import ViktorController, Color
-from viktor.parametrization import ViktorParametrization, Text, TextField, NumberField, DateField,LineBreak, ColorField
+from viktor import ViktorController, Color, File, UserError, progress_message
+from viktor.parametrization import ViktorParametrization, Text, TextField, NumberField, DateField,LineBreak, ColorField, FileField, OptionField, DownloadButton
 from viktor.views import GeometryView, GeometryResult, PDFView, PDFResult
 from viktor.geometry import Group, Material, SquareBeam, Vector, Point, Line
-from viktor.external.word import render_word_file, WordFileTag, WordFileImage
 from viktor.utils import convert_word_to_pdf
 from viktor.result import DownloadResult
 import math
 
+from corbel_core import CONCRETE_GRADE, STEEL_GRADE, calc_corbel, check_ratio, lever_arm
+from report_batch import combine_pdfs, read_corbel_table, render_batch, report_values, zip_reports
+from report_cache import ReportCache, report_key
+from report_template import ReportTemplate
+
+TEMPLATE_PATH = Path(__file__).parent / "files" / "Template.docx"
+
+# Parsed once per worker, reloaded when the file changes
+REPORT_TEMPLATE = ReportTemplate(TEMPLATE_PATH)
+
+# Rendered DOCX / converted PDF bytes, shared by all views and downloads of this worker
+REPORT_CACHE = ReportCache()
+
 
 class Parametrization(ViktorParametrization):
     intro = Text("# 3D model of Concrete Corbel\n This app parametrically designs and visualizes a 3D model of a corbel")
@@ -34,6 +47,13 @@ class Parametrization(ViktorParametrization):
 
     V = NumberField("Vertical Force", min = 0, default=250, suffix='kN')
     H = NumberField("Horizontal Force", default=85, suffix='kN')
+    lb3 = LineBreak()
+
+    txt_batch = Text('### Batch Reports\n One report per row of a corbel table (Vertical Force, Horizontal Force, Corbel Name), '
+                     'using the geometry above.')
+    corbel_table = FileField("Corbel table (.csv)", file_types=['.csv'])
+    batch_output = OptionField("Output", options=['ZIP (one PDF per corbel)', 'Combined PDF'], default='ZIP (one PDF per corbel)')
+    batch_download = DownloadButton("Download batch reports", method='download_batch_reports')
 
     #static data
     #pad_offset = NumberField(int = 10)
@@ -58,30 +78,29 @@ class Controller(ViktorController):
         
         ac, hc, check = self.check_corbel(params)
 
-        # Create emtpy components list to be filled later
-        components = []
+        # same tags as the batch reports
+        values = report_values(params.project_name, params.engineer_name, params.element_name,
+                               params.date, As1, As2, ac, hc, check, conc_grade, steel_grade)
 
-        # Fill components list with data
-        components.append(WordFileTag("Project_name", params.project_name))
-        components.append(WordFileTag("engineer_name", params.engineer_name))
-        components.append(WordFileTag("element_name", params.element_name))
-        components.append(WordFileTag("date", str(params.date))) # Convert date to string format
+        return REPORT_TEMPLATE.render(values)  # .docx bytes
 
-        components.append(WordFileTag("concrete_grade", conc_grade))
-        components.append(WordFileTag("steel_grade", steel_grade))
-        components.append(WordFileTag("ac", ac))
-        components.append(WordFileTag("hc", hc))
-        components.append(WordFileTag("check", check))
+    @staticmethod
+    def report_key(params):
+        # a changed template must not be served from the cache
+        return report_key(params, extra=REPORT_TEMPLATE.version)
 
-        components.append(WordFileTag("As1", (round(As1,2), ' cm2')))
-        components.append(WordFileTag("As2", (round(As2,2), ' cm2')))
+    def word_bytes(self, params):
+        return REPORT_CACHE.get_or_create(
+            self.report_key(params), 'docx',
+            lambda: self.generate_word_document(params),
+        )
 
-        # Get path to template and render word file
-        template_path = Path(__file__).parent / "files" / "Template.docx"
-        with open(template_path, 'rb') as template:
-            word_file = render_word_file(template, components)
+    def pdf_bytes(self, params):
+        def convert():
+            pdf_file = convert_word_to_pdf(BytesIO(self.word_bytes(params)))
+            return pdf_file.getvalue_binary()
 
-        return word_file
+        return REPORT_CACHE.get_or_create(self.report_key(params), 'pdf', convert)
 
     @GeometryView("3D", duration_guess=1)
     def visualize_corbel(self, params, **kwargs):
@@ -138,46 +157,31 @@ class Controller(ViktorController):
    
     @PDFView("PDF viewer", duration_guess=5)
     def pdf_view(self, params, **kwargs):
-        word_file = self.generate_word_document(params)
-
-        with word_file.open_binary() as f1:
-            pdf_file = convert_word_to_pdf(f1)
+        # served from the report cache when the same params were rendered before
+        pdf_file = File.from_data(self.pdf_bytes(params))
 
         return PDFResult(file=pdf_file)
 
     @staticmethod
     def calc_corbel(params):
         
-        # calculation per Schneider 20. [5.124] eqs 5.11 and 5.24
-        conc_grade = 'C50/60'
-        steel_grade = 'B500B'
-
-        fck = 50 #50Mpa = 5kN/cm2 for C50/60 concrete
-        fy = 500
-        fyd = 500/1.15 
-        Vrd = (0.5*(0.7-fck/200)*(params.column_width*10/2)*(params.corbel_height*10)*fck/1.50)/1000 #calc conc. strut with V_Rdmax = 0,5*(0,7-fck/200)*b*z*fck/gammaC (in KN)
-        
-        cover = 5 #5cm concrete cover
-        d = params.corbel_height - cover
-        ac = params.corbel_width - params.pad_offset #cm
-        z0 = d*(1-0.4*(params.V/Vrd)) #cm
-
-        Zed = params.V*(ac/z0) + params.H*((cover+z0)/z0) #units in cm
+        # calculation per Schneider 20. [5.124] eqs 5.11 and 5.24, see corbel_core
+        res = calc_corbel(params.V, params.H, params.column_width, params.corbel_height,
+                          params.corbel_width, params.pad_offset)
 
-        As1 = (Zed/fyd)*100 #
-        As2 = As1*0.5 #in cm2
+        As1 = float(res.As1) #in cm2
+        As2 = float(res.As2) #in cm2
 
-
-        return [As1, As2, conc_grade, steel_grade]	
+        return [As1, As2, CONCRETE_GRADE, STEEL_GRADE]
                
  
     def check_corbel(self,params):
         
-        ac = params.corbel_width - params.pad_offset #cm
+        ac = lever_arm(params.corbel_width, params.pad_offset).item() #cm
         hc = params.corbel_height
 
         check = ''
-        if ac/hc <= 0.5:
+        if check_ratio(ac, hc):
             check = 'True'
         else:
             check = 'False'
@@ -186,8 +190,27 @@ class Controller(ViktorController):
 
 
     def download_word_file(self, params, **kwargs):
-        word_file = self.generate_word_document(params)
+        word_file = File.from_data(self.word_bytes(params))
 
         return DownloadResult(word_file, "Report.docx")
+
+    def download_batch_reports(self, params, **kwargs):
+        if params.corbel_table is None:
+            raise UserError("Upload a corbel table (.csv) first")
+        try:
+            rows = read_corbel_table(params.corbel_table.file.getvalue_binary())
+        except ValueError as e:
+            raise UserError(str(e))
+        if not rows:
+            raise UserError("The corbel table has no rows")
+
+        def progress(done, total, name):
+            progress_message(f"Report {done}/{total}: {name}", percentage=100 * done / total)
+
+        reports, res = render_batch(rows, params, REPORT_TEMPLATE, REPORT_CACHE, progress=progress)
+
+        if params.batch_output == 'Combined PDF':
+            return DownloadResult(File.from_data(combine_pdfs(reports)), "Corbel_reports.pdf")
+        return DownloadResult(File.from_data(zip_reports(reports, rows, res)), "Corbel_reports.zip")
     
 
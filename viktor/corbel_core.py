@@ -0,0 +1,92 @@
+"""
+Corbel calculation core shared by the VIKTOR app and the Streamlit tools.
+
+Calculation per Schneider 20. [5.124] eqs 5.11 and 5.24. Pure NumPy, no
+VIKTOR or Streamlit imports, so it can be used headless. Every input can
+be a scalar or an array; arrays broadcast against each other, so one call
+evaluates a whole load table or a full geometry grid.
+
+Units: forces in kN, lengths in cm, reinforcement in cm2.
+corbel_depth is the projection from the column face (the VIKTOR app calls
+it corbel_width).
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+CONCRETE_GRADE = 'C50/60'
+STEEL_GRADE = 'B500B'
+
+FCK = 50  # 50Mpa = 5kN/cm2 for C50/60 concrete
+FY = 500  # for B500B steel grade
+FYD = FY / 1.15
+GAMMA_C = 1.50
+COVER = 5  # 5cm concrete cover
+
+# RFEM load export headers (sample_corbel_data.csv) -> V / H / Location
+CSV_HEADER_MAP = {'Vertical Force': 'V', 'Horizontal Force': 'H', 'Corbel Name': 'Location'}
+
+# Corbel calculation types, index = code returned by corbel_type()
+EXTRA_SHORT, SHORT, STRUT_AND_TIE, CANTILEVER = 0, 1, 2, 3
+TYPE_LABELS = (
+    'Extra Short Corbel',
+    'Short Corbel',
+    'Strut and Tie Corbel',
+    'Error: Calculate as cantilever beam if ac > hc',
+)
+
+
+class CorbelResult(NamedTuple):
+    Vrd: np.ndarray    # concrete strut capacity [kN]
+    d: np.ndarray      # effective depth [cm]
+    ac: np.ndarray     # lever arm of V from the column face [cm]
+    z0: np.ndarray     # internal lever arm [cm]
+    Zed: np.ndarray    # tie force [kN]
+    As1: np.ndarray    # primary (anchorage) rebar [cm2]
+    As2: np.ndarray    # secondary (stirrup) rebar [cm2]
+    valid: np.ndarray  # z0 > 0, i.e. V < Vrd/0.4
+
+
+def strut_capacity(column_width, corbel_height, fck=FCK):
+    # V_Rdmax = 0,5*(0,7-fck/200)*b*z*fck/gammaC (in kN), b = column_width/2
+    return (0.5 * (0.7 - fck / 200) * (np.asarray(column_width) * 10 / 2)
+            * (np.asarray(corbel_height) * 10) * fck / GAMMA_C) / 1000
+
+
+def lever_arm(corbel_depth, pad_offset):
+    return np.asarray(corbel_depth) - np.asarray(pad_offset)  # cm
+
+
+def calc_corbel(V, H, column_width, corbel_height, corbel_depth, pad_offset,
+                fck=FCK, fyd=FYD, cover=COVER) -> CorbelResult:
+    V = np.asarray(V, dtype=float)
+    H = np.asarray(H, dtype=float)
+    hc = np.asarray(corbel_height, dtype=float)
+
+    Vrd = strut_capacity(column_width, hc, fck)
+    d = hc - cover
+    ac = lever_arm(corbel_depth, pad_offset)
+    z0 = d * (1 - 0.4 * (V / Vrd))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Zed = V * (ac / z0) + H * ((cover + z0) / z0)  # kN
+
+    As1 = (Zed / fyd) * 100  # cm2
+    As2 = As1 * 0.5  # cm2
+    return CorbelResult(Vrd, d, ac, z0, Zed, As1, As2, z0 > 0)
+
+
+def corbel_type(ac, hc):
+    """Calculation type code per point, see TYPE_LABELS."""
+    ac = np.asarray(ac, dtype=float)
+    hc = np.asarray(hc, dtype=float)
+    return np.select(
+        [ac <= 0.2 * hc, ac < 0.5 * hc, (0.4 * hc <= ac) & (ac <= hc)],
+        [EXTRA_SHORT, SHORT, STRUT_AND_TIE],
+        default=CANTILEVER,
+    )
+
+
+def check_ratio(ac, hc):
+    """Geometry check of the report: ac/hc <= 0.5."""
+    return np.asarray(ac) / np.asarray(hc) <= 0.5
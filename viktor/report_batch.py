@@ -0,0 +1,191 @@
+"""
+Batch reports for a table of corbels.
+
+The table has the same shape as sample_corbel_data.csv (Vertical Force,
+Horizontal Force, Corbel Name; V/H/Location also accepted). All corbels
+are calculated in one vectorized corbel_core call, then every report is
+rendered from the pre-parsed Template.docx (report_template) and converted
+to PDF in a bounded thread pool (the conversion is a remote service call,
+so threads spend their time waiting). Converted reports go through the report cache, so a rerun of
+the same batch is served from disk.
+"""
+import csv
+import io
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+from typing import NamedTuple
+
+import numpy as np
+
+from viktor.utils import convert_word_to_pdf
+
+from corbel_core import CONCRETE_GRADE, CSV_HEADER_MAP, STEEL_GRADE, calc_corbel, check_ratio
+from report_cache import report_key
+
+MAX_WORKERS = 4
+
+
+class BatchReport(NamedTuple):
+    name: str
+    pdf: bytes
+    render_s: float
+    convert_s: float
+    cached: bool
+
+
+def report_values(project_name, engineer_name, element_name, date, As1, As2, ac, hc, check,
+                  concrete_grade=CONCRETE_GRADE, steel_grade=STEEL_GRADE):
+    """Tag values for Template.docx."""
+    return {
+        "Project_name": project_name,
+        "engineer_name": engineer_name,
+        "element_name": element_name,
+        "date": str(date),  # Convert date to string format
+        "concrete_grade": concrete_grade,
+        "steel_grade": steel_grade,
+        "ac": ac,
+        "hc": hc,
+        "check": check,
+        "As1": f"{round(As1, 2)} cm2",
+        "As2": f"{round(As2, 2)} cm2",
+    }
+
+
+def read_corbel_table(data):
+    """CSV bytes -> list of {'Location', 'V', 'H'} rows."""
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig')))
+    fields = {raw: CSV_HEADER_MAP.get(raw.strip(), raw.strip()) for raw in reader.fieldnames or []}
+    missing = {'V', 'H', 'Location'} - set(fields.values())
+    if missing:
+        raise ValueError(f"Missing column(s) {sorted(missing)}, expected {list(CSV_HEADER_MAP)}")
+
+    rows = []
+    for line, raw in enumerate(reader, start=2):
+        row = {fields[k]: v for k, v in raw.items() if k in fields}
+        if not any((v or '').strip() for v in row.values()):
+            continue
+        # a short row leaves its last cells None
+        empty = [name for name in ('Location', 'V', 'H') if not (row.get(name) or '').strip()]
+        if empty:
+            raise ValueError(f"Line {line}: missing value(s) for {', '.join(empty)}")
+        try:
+            rows.append({'Location': row['Location'].strip(), 'V': float(row['V']), 'H': float(row['H'])})
+        except ValueError:
+            raise ValueError(f"Line {line}: V and H must be numbers")
+    return rows
+
+
+def corbel_params(params, row):
+    """Report params of one table row: sidebar geometry + the row's name and loads."""
+    return SimpleNamespace(
+        project_name=params.project_name,
+        engineer_name=params.engineer_name,
+        element_name=row['Location'],
+        date=params.date,
+        column_width=params.column_width,
+        corbel_height=params.corbel_height,
+        corbel_width=params.corbel_width,
+        pad_offset=params.pad_offset,
+        V=row['V'],
+        H=row['H'],
+    )
+
+
+def design_rows(rows, params):
+    """All corbels of the table in one vectorized call."""
+    V = np.array([r['V'] for r in rows], dtype=float)
+    H = np.array([r['H'] for r in rows], dtype=float)
+    return calc_corbel(V, H, params.column_width, params.corbel_height, params.corbel_width, params.pad_offset)
+
+
+def _render_one(template, values, key, cache):
+    cached = cache.get(key, 'pdf')
+    if cached is not None:
+        return cached, 0.0, 0.0, True
+
+    t0 = time.perf_counter()
+    docx = template.render(values)
+    t1 = time.perf_counter()
+    pdf = convert_word_to_pdf(io.BytesIO(docx)).getvalue_binary()
+    t2 = time.perf_counter()
+
+    cache.put(key, 'docx', docx)
+    cache.put(key, 'pdf', pdf)
+    return pdf, t1 - t0, t2 - t1, False
+
+
+def render_batch(rows, params, template, cache, max_workers=MAX_WORKERS, progress=None):
+    """
+    Render + convert one report per row. progress(done, total, name) is
+    called from the calling thread after each finished report.
+    Returns BatchReport items in table order and the vectorized results.
+    """
+    res = design_rows(rows, params)
+    ac = res.ac.item()  # same geometry for every row
+    hc = params.corbel_height
+    check = 'True' if check_ratio(ac, hc) else 'False'
+
+    jobs = []
+    for i, row in enumerate(rows):
+        values = report_values(
+            params.project_name, params.engineer_name, row['Location'], params.date,
+            float(res.As1[i]), float(res.As2[i]), ac, hc, check,
+        )
+        jobs.append((row['Location'], values, report_key(corbel_params(params, row), extra=template.version)))
+
+    reports = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_render_one, template, values, key, cache): i
+            for i, (_, values, key) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            pdf, render_s, convert_s, cached = future.result()
+            reports[i] = BatchReport(jobs[i][0], pdf, render_s, convert_s, cached)
+            if progress is not None:
+                progress(done, len(jobs), jobs[i][0])
+    return reports, res
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'corbel'
+
+
+def zip_reports(reports, rows, res):
+    """One PDF per corbel + summary.csv (results) + timings.csv (per corbel)."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, report in enumerate(reports, start=1):
+            zf.writestr(f'{i:03d}_{_safe_name(report.name)}.pdf', report.pdf)
+
+        summary = io.StringIO()
+        writer = csv.writer(summary)
+        writer.writerow(['Corbel Name', 'V [kN]', 'H [kN]', 'z0 [cm]', 'As1 [cm2]', 'As2 [cm2]'])
+        for i, row in enumerate(rows):
+            writer.writerow([row['Location'], row['V'], row['H'],
+                             round(float(res.z0[i]), 2), round(float(res.As1[i]), 2), round(float(res.As2[i]), 2)])
+        zf.writestr('summary.csv', summary.getvalue())
+
+        timings = io.StringIO()
+        writer = csv.writer(timings)
+        writer.writerow(['Corbel Name', 'render [s]', 'convert [s]', 'from cache'])
+        for report in reports:
+            writer.writerow([report.name, round(report.render_s, 3), round(report.convert_s, 3), report.cached])
+        zf.writestr('timings.csv', timings.getvalue())
+    return buf.getvalue()
+
+
+def combine_pdfs(reports):
+    """All reports in one PDF (needs pypdf)."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for report in reports:
+        writer.append(io.BytesIO(report.pdf))
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
@@ -0,0 +1,137 @@
+"""
+On-disk cache for rendered corbel reports.
+
+Rendered DOCX and converted PDF bytes are stored under a canonical hash of
+the params that feed the document, so reopening the PDF view or
+downloading the Word file after viewing does not render or convert again.
+Least recently used files are removed once the folder exceeds its size cap;
+the folder is only listed when a running total says the cap is exceeded.
+
+The folder is DESIGNFLOW_REPORT_CACHE_DIR if set, else one folder per app
+namespace under the system temp dir.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+CACHE_DIR_ENV = 'DESIGNFLOW_REPORT_CACHE_DIR'
+DEFAULT_NAMESPACE = 'corbel'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# eviction frees down to this share of the cap, so a full cache is not listed on every put
+LOW_WATER = 0.9
+
+
+def default_directory(namespace=DEFAULT_NAMESPACE):
+    """$DESIGNFLOW_REPORT_CACHE_DIR/<namespace>, or <temp dir>/designflow_reports/<namespace>."""
+    root = os.environ.get(CACHE_DIR_ENV) or Path(tempfile.gettempdir()) / 'designflow_reports'
+    return Path(root) / namespace
+
+# Params rendered into Template.docx (directly or through the corbel calculation)
+REPORT_FIELDS = (
+    'project_name', 'engineer_name', 'element_name', 'date',
+    'column_width', 'corbel_height', 'corbel_width', 'pad_offset',
+    'V', 'H',
+)
+
+
+def _canonical(value):
+    # 80 and 80.0 must give the same key, dates/other objects go through str()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def report_key(params, fields=REPORT_FIELDS, extra=()):
+    """sha256 of the canonical JSON of the report params (plus e.g. a template version)."""
+    values = {name: _canonical(getattr(params, name, None)) for name in fields}
+    payload = json.dumps([values, [_canonical(v) for v in extra]], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ReportCache:
+    """Bytes per (key, kind) in one folder, LRU by file mtime, bounded by max_bytes."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, namespace=DEFAULT_NAMESPACE):
+        self.directory = Path(directory) if directory is not None else default_directory(namespace)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # running size of the folder; other workers may write too, so the scan in evict() corrects it
+        self._total = self._scan_total()
+
+    def _path(self, key, kind):
+        return self.directory / f'{key}.{kind}'
+
+    def get(self, key, kind):
+        path = self._path(key, kind)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, kind, data):
+        path = self._path(key, kind)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        # write + rename so a parallel reader never sees a half-written file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - replaced
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+        return data
+
+    def get_or_create(self, key, kind, create):
+        data = self.get(key, kind)
+        if data is None:
+            data = self.put(key, kind, create())
+        return data
+
+    def _entries(self):
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """List the folder and remove least recently used files until it is below LOW_WATER * max_bytes."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                self._total = total
+                return
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * LOW_WATER:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._total = total
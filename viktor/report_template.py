@@ -0,0 +1,152 @@
+"""
+Pre-parsed Word report template.
+
+Template.docx is read and tokenised once per process instead of being
+reopened and parsed for every report. Word splits typed {{tags}} over
+several runs, so split tags are first merged back into one text node;
+every XML part with tags is then stored as a list of literal pieces with
+the tag positions indexed by name. A render only substitutes the values
+into a copy of that list and appends the parts to a copy of a prebuilt
+zip holding all untouched members (styles, images, ...), so those are
+never re-compressed. The template is reloaded when its mtime or size
+changes.
+
+Only bare {{name}} tags are supported. Any other docxtpl / Jinja syntax
+({% if %}, loops, filters, comments) raises ValueError when the template
+is loaded instead of ending up unrendered in the reports.
+"""
+import io
+import os
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+_TEXT_RE = re.compile(r'(<w:t(?:\s[^>]*)?>)([^<]*)(</w:t>)')
+_TAG_RE = re.compile(r'\{\{\s*([A-Za-z_]\w*)\s*\}\}')
+# everything docxtpl would treat as template syntax
+_SYNTAX_RE = re.compile(r'\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\}|\{%|\{#')
+
+# XML parts that may hold tags
+_TEMPLATED = re.compile(r'word/(document|header\d*|footer\d*)\.xml')
+
+
+def _merge_split_tags(xml):
+    """Move every '{{ ... }}' that Word split over several w:t nodes into the first of them."""
+    nodes = list(_TEXT_RE.finditer(xml))
+    texts = [m.group(2) for m in nodes]
+
+    i = 0
+    while i < len(texts):
+        text = texts[i]
+        start = text.rfind('{{')
+        if start == -1 or '}}' in text[start:]:
+            i += 1
+            continue
+        j = i + 1
+        while j < len(texts) and '}}' not in texts[j]:
+            j += 1
+        if j == len(texts):
+            break  # unclosed tag, leave as is
+        end = texts[j].index('}}') + 2
+        texts[i] = text + ''.join(texts[i + 1:j]) + texts[j][:end]
+        for k in range(i + 1, j):
+            texts[k] = ''
+        texts[j] = texts[j][end:]
+        i = j  # the rest of node j can open the next tag
+
+    out, pos = [], 0
+    for m, text in zip(nodes, texts):
+        open_tag = m.group(1)
+        if '{{' in text and 'xml:space' not in open_tag:
+            open_tag = '<w:t xml:space="preserve">'  # keep spaces of substituted values
+        out += [xml[pos:m.start()], open_tag, text, m.group(3)]
+        pos = m.end()
+    out.append(xml[pos:])
+    return ''.join(out)
+
+
+def _check_syntax(xml, part):
+    """ValueError for template syntax other than bare {{name}} tags in the text of an XML part."""
+    text = ''.join(m.group(2) for m in _TEXT_RE.finditer(xml))
+    for m in _SYNTAX_RE.finditer(text):
+        if not _TAG_RE.fullmatch(m.group()):
+            raise ValueError(f"{part}: unsupported template syntax {m.group()[:60]!r}, "
+                             f"only plain {{{{name}}}} tags are rendered")
+
+
+def _format(value):
+    return escape('' if value is None else str(value))
+
+
+class ReportTemplate:
+    """Tokenised .docx template, render(values) -> .docx bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._base = b''    # zip with every member that has no tags
+        self._parts = {}    # part name -> literal pieces, tag names at odd indices
+        self._index = {}    # tag name -> [(part name, piece index)]
+
+    @property
+    def version(self):
+        """(mtime_ns, size) of the template file, part of the report cache key."""
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def tags(self):
+        self._ensure_loaded()
+        return sorted(self._index)
+
+    def _ensure_loaded(self):
+        version = self.version
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._load()
+                self._version = version
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        parts, index = {}, {}
+        base = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(base, 'w') as dst:
+            for info in src.infolist():
+                raw = src.read(info)
+                if _TEMPLATED.fullmatch(info.filename):
+                    xml = _merge_split_tags(raw.decode('utf-8'))
+                    _check_syntax(xml, info.filename)
+                    pieces = _TAG_RE.split(xml)
+                    if len(pieces) > 1:
+                        parts[info.filename] = pieces
+                        for i in range(1, len(pieces), 2):
+                            index.setdefault(pieces[i], []).append((info.filename, i))
+                        continue
+                dst.writestr(info, raw)
+
+        self._base, self._parts, self._index = base.getvalue(), parts, index
+
+    def render(self, values):
+        """Substitute values (tag name -> value) into a copy of the template; missing tags render empty."""
+        self._ensure_loaded()
+        with self._lock:
+            base, parts, index = self._base, self._parts, self._index
+
+        filled = {name: list(pieces) for name, pieces in parts.items()}
+        for tag, places in index.items():
+            text = _format(values.get(tag))
+            for name, i in places:
+                filled[name][i] = text
+
+        out = io.BytesIO(base)
+        out.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(out, 'a', zipfile.ZIP_DEFLATED) as zf:
+            for name, pieces in filled.items():
+                zf.writestr(name, ''.join(pieces))
+        return out.getvalue()